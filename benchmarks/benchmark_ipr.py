@@ -0,0 +1,163 @@
+"""Benchmarks of the IPR fitting paths on synthetic fields.
+
+Times fitting, curve evaluation, CSV round-trip and plot generation separately and reports
+throughput (wells/s), peak traced memory and parameter-recovery error against the known
+coefficients of the synthetic field.
+
+    python benchmarks/benchmark_ipr.py --wells 10 1000 100000 --solvers batch minimize
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ipr.fitting import calculate_coefficients
+from ipr.models import curve_IPR, curve_IPR_Vogel
+from ipr.plots import figure_IPR_curve, figure_Vogel_curve
+from ipr.synthetic import synthetic_field
+from ipr.wells import WellIndex
+
+# Wells evaluated at once when sampling curves, to keep memory bounded on large fields
+CURVE_BATCH = 10_000
+
+# Run function() and return its result, wall time and peak traced memory (MB).
+# tracemalloc slows pandas down a lot, so memory is measured on a second, separate run.
+def measure(function, memory=True):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    peak = np.nan
+    if memory:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+# Sample the fitted curve of every well at 500 points, as the plots do
+def evaluate_curves(reservoir_type, coefficients_df):
+    fraction = np.linspace(0, 1, 500)
+    total = 0.0
+    for start in range(0, len(coefficients_df), CURVE_BATCH):
+        batch = coefficients_df.iloc[start:start + CURVE_BATCH]
+        Pws = batch['Pres (bar)'].to_numpy()[:, None]
+        if reservoir_type == 'Gas':
+            a = batch['a (bar2/(m3/d)2)'].to_numpy()[:, None] * 1e6
+            b = batch['b (bar2/m3/d)'].to_numpy()[:, None] * 1000
+            Q_range = batch['AOF (km3/d)'].to_numpy()[:, None] * fraction
+            total += np.nansum(curve_IPR(Q_range, [a, b, Pws]))
+        else:
+            Qmax = batch['Qmax (m3/d)'].to_numpy()[:, None]
+            total += np.nansum(curve_IPR_Vogel(Pws * fraction, Pws, Qmax))
+    return total
+
+def csv_round_trip(data):
+    buffer = io.StringIO()
+    data.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+# Render the plots of the first n_plots wells to PNG
+def render_plots(reservoir_type, data, coefficients_df, n_plots):
+    index = WellIndex.from_data(data, reservoir_type)
+    for i in range(min(n_plots, len(index))):
+        Pwf, Q = index.test_data(i)
+        row = coefficients_df.iloc[i]
+        if reservoir_type == 'Gas':
+            fig = figure_IPR_curve(row['Well'], Q, Pwf, row['Pres (bar)'], row['a (bar2/(m3/d)2)'] * 1e6,
+                                   row['b (bar2/m3/d)'] * 1000, row['AOF (km3/d)'])
+        else:
+            fig = figure_Vogel_curve(row['Well'], Q, Pwf, row['Pres (bar)'], row['Qmax (m3/d)'])
+        fig.savefig(io.BytesIO(), format='png')
+        plt.close(fig)
+
+# Median and 90th percentile of the relative error of the fitted AOF / Qmax against the truth
+def recovery_error(reservoir_type, coefficients_df, truth):
+    column = 'AOF (km3/d)' if reservoir_type == 'Gas' else 'Qmax (m3/d)'
+    error = np.abs(coefficients_df[column].to_numpy() / truth[column].to_numpy() - 1)
+    return np.nanmedian(error), np.nanpercentile(error, 90)
+
+def benchmark(reservoir_type, n_wells, solvers, args):
+    data, truth = synthetic_field(reservoir_type, n_wells, tests=tuple(args.tests), noise=args.noise, seed=args.seed)
+    rows = []
+
+    def row(stage, solver, elapsed, peak, wells=n_wells, error=(np.nan, np.nan)):
+        rows.append({'Reservoir': reservoir_type, 'Wells': n_wells, 'Tests': len(data), 'Stage': stage,
+                     'Solver': solver, 'Time (s)': elapsed, 'Wells/s': wells / elapsed if elapsed else np.inf,
+                     'Peak memory (MB)': peak, 'Median error': error[0], 'P90 error': error[1]})
+
+    coefficients_df = None
+    for solver in solvers:
+        if solver != 'batch' and n_wells > args.max_minimize_wells:
+            continue
+        coefficients_df, elapsed, peak = measure(lambda: calculate_coefficients(data, reservoir_type, solver=solver,
+                                                                                backend=args.backend),
+                                                 memory=args.memory)
+        row('fit', solver, elapsed, peak, error=recovery_error(reservoir_type, coefficients_df, truth))
+
+    if coefficients_df is None:
+        return rows
+
+    _, elapsed, peak = measure(lambda: evaluate_curves(reservoir_type, coefficients_df), memory=args.memory)
+    row('curves', '', elapsed, peak)
+
+    if n_wells <= args.max_csv_wells:
+        _, elapsed, peak = measure(lambda: csv_round_trip(data), memory=args.memory)
+        row('csv round-trip', '', elapsed, peak)
+
+    if args.plots:
+        n_plots = min(args.plots, n_wells)
+        _, elapsed, peak = measure(lambda: render_plots(reservoir_type, data, coefficients_df, n_plots),
+                                   memory=args.memory)
+        row('plots', '', elapsed, peak, wells=n_plots)
+
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--wells', type=int, nargs='+', default=[10, 1000, 100_000], help="field sizes")
+    parser.add_argument('--reservoir', choices=['Gas', 'Oil', 'both'], default='both')
+    parser.add_argument('--solvers', nargs='+', default=['batch', 'minimize'],
+                        choices=['batch', 'minimize', 'least_squares'])
+    parser.add_argument('--backend', default='serial', choices=['serial', 'threads', 'processes'],
+                        help="backend of the per-well solvers")
+    parser.add_argument('--tests', type=int, nargs=2, default=[2, 6], metavar=('MIN', 'MAX'),
+                        help="range of the number of tests per well")
+    parser.add_argument('--noise', type=float, default=0.01, help="relative noise of the synthetic measurements")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--plots', type=int, default=20, help="number of wells to plot (0 to skip)")
+    parser.add_argument('--max-minimize-wells', type=int, default=2000,
+                        help="skip the per-well solvers (minimize, least_squares) on larger fields")
+    parser.add_argument('--max-csv-wells', type=int, default=1_000_000,
+                        help="skip the CSV round-trip on larger fields")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="don't measure peak memory (saves a second run of every stage)")
+    parser.add_argument('--output', help="also write the results to this CSV file")
+    args = parser.parse_args()
+
+    reservoir_types = ['Gas', 'Oil'] if args.reservoir == 'both' else [args.reservoir]
+    rows = []
+    np.seterr(all='ignore')
+    for reservoir_type in reservoir_types:
+        for n_wells in args.wells:
+            rows.extend(benchmark(reservoir_type, n_wells, args.solvers, args))
+
+    results = pd.DataFrame(rows)
+    print(tabulate(results, headers='keys', tablefmt='github', showindex=False, floatfmt='.4g'))
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Startup benchmark of the command line entry point (python -m ipr).
+
+Runs the CLI in fresh interpreters, as a scheduler calling it once per well would, and reports the
+median wall time of each case and the modules the core package imports.
+
+    python benchmarks/benchmark_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+from tabulate import tabulate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ipr.synthetic import synthetic_field
+
+# Heavy modules that importing the core package must not pull in
+HEAVY_MODULES = ('scipy', 'matplotlib', 'plotly', 'streamlit')
+
+def run(arguments):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'ipr', *arguments], check=True, env=env, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def imported_modules(statement):
+    code = f"import sys; {statement}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, '-c', code], check=True, env=env, capture_output=True,
+                          text=True).stdout.strip() or '-'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--wells', type=int, default=1000, help="wells of the synthetic input file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tests.csv')
+        synthetic_field('Gas', args.wells)[0].to_csv(path, index=False)
+        well = pd.read_csv(path, nrows=1)['Well'][0]
+
+        cases = {
+            'help': ['--help'],
+            'one well, batch': [path, '--wells', well],
+            'one well, least_squares': [path, '--wells', well, '--solver', 'least_squares'],
+            f'{args.wells} wells, batch': [path],
+        }
+        rows = [{'Case': case, 'Median wall time (s)': statistics.median(run(arguments) for _ in range(args.runs))}
+                for case, arguments in cases.items()]
+
+    print(tabulate(rows, headers='keys', tablefmt='github', floatfmt='.3f'))
+    print()
+    print("Heavy modules imported by 'import ipr':", imported_modules('import ipr'))
+    print("Heavy modules imported by 'from ipr import calculate_coefficients':",
+          imported_modules('from ipr import calculate_coefficients'))
+
+if __name__ == "__main__":
+    main()
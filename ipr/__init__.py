@@ -0,0 +1,19 @@
+# IPR models and fitting routines shared by the Streamlit pages.
+# The re-exports below are resolved on first use, so `python -m ipr` and the submodules that don't need
+# numpy, pandas or scipy (e.g. ipr.cli) start fast.
+_EXPORTS = {
+    'calculate_coefficients': 'ipr.fitting',
+    'calculate_AOF': 'ipr.models',
+    'curve_IPR': 'ipr.models',
+    'curve_IPR_Vogel': 'ipr.models',
+    'error_function': 'ipr.models',
+    'error_function_vogel': 'ipr.models',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'ipr' has no attribute '{name}'")
+    import importlib
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,3 @@
+from ipr.cli import main
+
+main()
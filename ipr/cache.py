@@ -0,0 +1,103 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Content-addressed cache of fitted well parameters.
+# Entries are keyed by a hash of the well's test data, the model and the solver settings, so a well
+# is only refit when one of those changes. The in-memory tier is an LRU bounded by max_entries; the
+# optional on-disk tier stores one .npy file per entry and is bounded by max_disk_entries, evicting
+# the least recently used files (access time is tracked through the file modification time).
+class FitCache:
+    def __init__(self, max_entries=100_000, directory=None, max_disk_entries=1_000_000):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.disk_entries = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.disk_entries = sum(1 for entry in os.scandir(directory) if entry.name.endswith(".npy"))
+
+    # Key of one well fit: hash of the (Pres, BHP, Rate) arrays, the model type and the solver settings
+    @staticmethod
+    def key(model, Pws, Pwf, Q, **settings):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(model.encode())
+        digest.update(repr(sorted(settings.items())).encode())
+        for values in (Pws, Pwf, Q):
+            values = np.ascontiguousarray(values, dtype=float)
+            digest.update(str(values.size).encode())
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    # Fitted parameters stored under key, or None
+    def get(self, key):
+        with self.lock:
+            params = self.memory.get(key)
+            if params is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return params
+
+            if self.directory is not None and os.path.exists(self.path(key)):
+                try:
+                    params = np.load(self.path(key))
+                    os.utime(self.path(key))
+                except (OSError, ValueError):
+                    params = None
+                if params is not None:
+                    self.store_memory(key, params)
+                    self.hits += 1
+                    return params
+
+            self.misses += 1
+            return None
+
+    def put(self, key, params):
+        params = np.asarray(params, dtype=float)
+        with self.lock:
+            self.store_memory(key, params)
+            if self.directory is not None:
+                if not os.path.exists(self.path(key)):
+                    self.disk_entries += 1
+                np.save(self.path(key), params)
+                if self.disk_entries > self.max_disk_entries:
+                    self.evict_disk()
+
+    def store_memory(self, key, params):
+        self.memory[key] = params
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def evict_disk(self):
+        # Evict down to 90% of the bound, so the directory isn't scanned again on the next put
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".npy")]
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - int(self.max_disk_entries * 0.9)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        self.disk_entries = sum(1 for entry in os.scandir(self.directory) if entry.name.endswith(".npy"))
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'entries': len(self.memory), 'hits': self.hits, 'misses': self.misses}
+
+# Cache shared by all pages of the app. Set IPR_CACHE_DIR to also keep fits on disk between sessions.
+fit_cache = FitCache(directory=os.environ.get("IPR_CACHE_DIR"))
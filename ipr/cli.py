@@ -0,0 +1,122 @@
+import argparse
+import sys
+import time
+
+DESCRIPTION = """Fit the IPR of every well of a multiwell test file and write the coefficients table.
+
+The input has the columns of the multiwell page: Well, Pres (bar), BHP (bar) and Rate (km3/d) for gas
+or Rate (m3/d) for oil. CSV, Parquet and Feather files are read by extension (only the needed columns,
+memory mapped), '-' reads CSV from stdin.
+Tests that can't be fitted (missing values, BHP >= Pres, negative rates) are left out before fitting and
+wells without a valid flowing test are skipped; a summary is printed to stderr.
+
+    python -m ipr tests.csv -o coefficients.csv
+    python -m ipr tests.parquet --wells W001 --solver least_squares --timing
+    python -m ipr tests.feather -o coefficients.parquet
+    python -m ipr tests.parquet --window 180 --step 30 -o history.csv
+"""
+
+def parser():
+    parser = argparse.ArgumentParser(prog='python -m ipr', description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="multiwell test file (.csv, .parquet or .feather), or - for CSV on stdin")
+    parser.add_argument('-o', '--output', default='-',
+                        help="coefficients file (.csv, .parquet or .feather), - (default) for CSV on stdout")
+    parser.add_argument('--reservoir', choices=['Gas', 'Oil'],
+                        help="reservoir type (default: from the rate column of the input)")
+    parser.add_argument('--wells', nargs='+', help="only fit these wells")
+    parser.add_argument('--solver', default='batch', choices=['batch', 'minimize', 'least_squares'])
+    parser.add_argument('--backend', default='serial', choices=['serial', 'threads', 'processes'],
+                        help="backend of the per-well solvers")
+    parser.add_argument('--workers', type=int, help="workers of the threads and processes backends")
+    parser.add_argument('--warm-start', help="'linear' or a previous coefficients file, for the per-well solvers")
+    parser.add_argument('--bootstrap', type=int, default=0, help="bootstrap resamples for P10/P50/P90 columns")
+    parser.add_argument('--diagnostics', action='store_true', help="add the solver diagnostics columns")
+    history = parser.add_argument_group("history", "fit every well over time windows of its Date column and "
+                                                   "write one row per (well, window)")
+    history.add_argument('--window', type=int, help="rolling window length in days")
+    history.add_argument('--step', type=int, help="days between rolling windows (default: the window length)")
+    history.add_argument('--calendar', choices=['month', 'quarter', 'year'], help="calendar windows")
+    history.add_argument('--min-tests', type=int,
+                         help="minimum flowing tests per window (default: 2 for gas, 1 for oil)")
+    parser.add_argument('--validation-report', help="write the per-well validation report to this file")
+    parser.add_argument('--timing', action='store_true', help="print import, read, fit and write times to stderr")
+    return parser
+
+# Tables from and to files by extension (see ipr.tables), or CSV on stdin / stdout for '-'
+def read_table(path, columns=None):
+    from ipr import tables
+    return tables.read_table(sys.stdin if path == '-' else path, columns, 'csv' if path == '-' else None)
+
+def write_table(table, path):
+    from ipr import tables
+    tables.write_table(table, sys.stdout if path == '-' else path, 'csv' if path == '-' else None)
+
+# Reservoir type of a multiwell test table from its rate column
+def infer_reservoir_type(data):
+    if "Rate (km3/d)" in data.columns:
+        return 'Gas'
+    if "Rate (m3/d)" in data.columns:
+        return 'Oil'
+    return None
+
+def main(argv=None):
+    start = time.perf_counter()
+    args = parser().parse_args(argv)
+
+    # Imported here so --help and argument errors don't pay for numpy and pandas
+    from ipr.fitting import calculate_coefficients
+    from ipr.tables import TEST_COLUMNS
+    from ipr.validation import validate_tests, validation_summary
+    timings = {'import': time.perf_counter() - start}
+
+    step = time.perf_counter()
+    data = read_table(args.input, TEST_COLUMNS)
+    reservoir_type = args.reservoir or infer_reservoir_type(data)
+    if reservoir_type is None:
+        sys.exit("error: no 'Rate (km3/d)' or 'Rate (m3/d)' column, use --reservoir")
+    if args.wells:
+        data = data[data["Well"].astype(str).isin(args.wells)]
+    warm_start = args.warm_start
+    if warm_start is not None and warm_start != 'linear':
+        warm_start = read_table(warm_start)
+    timings['read'] = time.perf_counter() - step
+
+    # Rows and wells that can't be fitted are left out before any solver runs
+    step = time.perf_counter()
+    try:
+        valid_data, report = validate_tests(data, reservoir_type)
+    except ValueError as error:
+        sys.exit(f"error: {error}")
+    if len(report):
+        print(validation_summary(report, data, valid_data), file=sys.stderr)
+    if args.validation_report:
+        write_table(report, args.validation_report)
+    data = valid_data
+    timings['validate'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    if args.window or args.calendar:
+        from ipr.history import calculate_history
+        try:
+            coefficients_df = calculate_history(data, reservoir_type, window=args.window or 180, step=args.step,
+                                                calendar=args.calendar, min_tests=args.min_tests)
+        except ValueError as error:
+            sys.exit(f"error: {error}")
+    else:
+        coefficients_df = calculate_coefficients(data, reservoir_type, solver=args.solver, backend=args.backend,
+                                                 max_workers=args.workers, warm_start=warm_start,
+                                                 bootstrap=args.bootstrap, instrument=args.diagnostics)
+    timings['fit'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    write_table(coefficients_df, args.output)
+    timings['write'] = time.perf_counter() - step
+
+    if args.timing:
+        timings['total'] = time.perf_counter() - start
+        print(' '.join(f"{name}={seconds:.3f}s" for name, seconds in timings.items()), f"wells={len(coefficients_df)}",
+              file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import numpy as np
+
+from ipr.fitting import coefficients_params
+from ipr.models import curve_IPR, curve_IPR_Vogel
+
+# Sampled IPR curves of every well of a field in one contiguous float32 block, so plots, nodal analysis
+# and allocation tools can query a fitted IPR without re-evaluating it.
+# block[0] holds the rates and block[1] the bottomhole pressures, shape (wells, points); along each row
+# the rate increases from 0 to the AOF (Qmax for oil) and the pressure decreases from Pws to 0. Gas
+# curves are sampled evenly in rate and oil curves evenly in pressure, as in the plots.
+# The block can live in a .npy file opened as a memory map, so a large field doesn't have to fit in memory
+# and can be shared between processes.
+class CurveStore:
+    def __init__(self, wells, block):
+        self.wells = wells
+        self.block = block
+
+    @classmethod
+    def from_coefficients(cls, coefficients_df, reservoir_type, points=500, path=None):
+        params = coefficients_params(reservoir_type, coefficients_df)
+        Pws = coefficients_df['Pres (bar)'].to_numpy(dtype=float)[:, None]
+        fraction = np.linspace(0, 1, points)
+
+        if path is None:
+            block = np.empty((2, len(Pws), points), dtype=np.float32)
+        else:
+            block = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(2, len(Pws), points))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if reservoir_type == 'Gas':
+                AOF = coefficients_df['AOF (km3/d)'].to_numpy(dtype=float)[:, None]
+                block[0] = AOF * fraction
+                # The last point is the AOF itself, where rounding could take Pws^2 - a*Q^2 - b*Q below 0
+                block[1] = np.where(fraction < 1, curve_IPR(AOF * fraction, [params[:, :1], params[:, 1:], Pws]), 0)
+            else:
+                Pwf = Pws * fraction[::-1]
+                block[0] = curve_IPR_Vogel(Pwf, Pws, params)
+                block[1] = Pwf
+
+        if path is not None:
+            block.flush()
+        return cls(coefficients_df['Well'].to_numpy(), block)
+
+    # Open a store saved with save() (or built with a path); the block is memory mapped by default
+    @classmethod
+    def load(cls, path, wells, mmap_mode='r'):
+        return cls(np.asarray(wells), np.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path):
+        np.save(path, self.block)
+
+    def __len__(self):
+        return self.block.shape[1]
+
+    # Sampled (Q, Pwf) of well i, e.g. for plotting
+    def curve(self, i):
+        return self.block[0, i], self.block[1, i]
+
+    # Rate of each (well, Pwf) pair, by linear interpolation on the sampled curves. wells are positions
+    # (row i of the coefficients table) and broadcast against Pwf. Pressures outside 0..Pws give NaN.
+    def rate_at_pressure(self, wells, Pwf):
+        wells, Pwf = np.broadcast_arrays(np.asarray(wells), np.asarray(Pwf, dtype=np.float32))
+        return self.interpolate(wells, Pwf, self.block[1], self.block[0], decreasing=True)
+
+    # Bottomhole pressure of each (well, rate) pair; rates outside 0..AOF give NaN
+    def pressure_at_rate(self, wells, Q):
+        wells, Q = np.broadcast_arrays(np.asarray(wells), np.asarray(Q, dtype=np.float32))
+        return self.interpolate(wells, Q, self.block[0], self.block[1], decreasing=False)
+
+    # Interpolate y(x) on row wells[k] of the sampled curves for every x[k] at once: a binary search run
+    # on all pairs together (log2(points) vectorized steps), then a linear interpolation in the bracket
+    @staticmethod
+    def interpolate(wells, x, x_samples, y_samples, decreasing):
+        points = x_samples.shape[1]
+        sign = -1 if decreasing else 1
+        low = np.zeros(wells.shape, dtype=np.intp)
+        high = np.full(wells.shape, points - 1, dtype=np.intp)
+        while True:
+            open_brackets = high - low > 1
+            if not open_brackets.any():
+                break
+            middle = (low + high) // 2
+            right = sign * x_samples[wells, middle] <= sign * x
+            low = np.where(open_brackets & right, middle, low)
+            high = np.where(open_brackets & ~right, middle, high)
+
+        x_low, x_high = x_samples[wells, low], x_samples[wells, high]
+        y_low, y_high = y_samples[wells, low], y_samples[wells, high]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(x_high != x_low, (x - x_low) / (x_high - x_low), 0)
+            y = y_low + weight * (y_high - y_low)
+        inside = (sign * x >= sign * x_samples[wells, 0]) & (sign * x <= sign * x_samples[wells, -1])
+        return np.where(inside, y, np.nan)
@@ -0,0 +1,95 @@
+import numpy as np
+
+from ipr.fitting import coefficients_params
+from ipr.models import curve_IPR_Vogel
+
+# Rate of every well at bottomhole pressure Pwf: the inverse of curve_IPR for gas (positive root of
+# a*Q^2 + b*Q = Pws^2 - Pwf^2) and curve_IPR_Vogel for oil. params are in solver units, one row per well.
+# Pwf broadcasts against the wells, e.g. shape (pressures,) gives rates of shape (wells, pressures).
+# Wells don't flow (rate 0) at or above their reservoir pressure.
+def well_rates(reservoir_type, params, Pws, Pwf):
+    Pws = np.asarray(Pws, dtype=float)[:, None]
+    Pwf = np.minimum(Pwf, Pws)
+    if reservoir_type == 'Gas':
+        a, b = params[:, 0, None], params[:, 1, None]
+        dP2 = Pws ** 2 - Pwf ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 2*dP2 / (b + sqrt(b^2 + 4*a*dP2)) is the positive root without cancellation, and dP2 / b when a = 0;
+            # it is 0 / 0 at dP2 = 0 when b = 0
+            Q = 2 * dP2 / (b + np.sqrt(b ** 2 + 4 * a * dP2))
+        return np.where(dP2 == 0, 0, Q)
+    return curve_IPR_Vogel(Pwf, Pws, params[:, 0, None])
+
+# Derivative of well_rates with respect to Pwf (negative, 0 above the reservoir pressure)
+def well_rates_slope(reservoir_type, params, Pws, Pwf):
+    Pws = np.asarray(Pws, dtype=float)[:, None]
+    flowing = Pwf < Pws
+    if reservoir_type == 'Gas':
+        a, b = params[:, 0, None], params[:, 1, None]
+        Q = well_rates(reservoir_type, params, Pws[:, 0], Pwf)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = -2 * Pwf / (2 * a * Q + b)
+    else:
+        slope = params[:, 0, None] * (-0.2 / Pws - 1.6 * Pwf / Pws ** 2)
+    return np.where(flowing, slope, 0)
+
+# Field IPR: total rate of all wells flowing at each common bottomhole pressure in Pwf. Wells without a
+# valid fit (NaN coefficients, or a = b = 0 and so an infinite AOF) are left out.
+def field_rate(reservoir_type, params, Pws, Pwf):
+    rates = well_rates(reservoir_type, params, Pws, np.atleast_1d(Pwf))
+    return np.sum(np.where(np.isfinite(rates), rates, 0), axis=0)
+
+# Common bottomhole (manifold) pressure at which all wells together deliver each target total rate,
+# for all targets at once: a safeguarded Newton iteration on the (monotone) field IPR, falling back to
+# bisection when a step leaves the bracket. Every iteration is one vectorized pass over wells x targets.
+# Returns the pressures (NaN where a target exceeds the field AOF) and the rate allocated to every well,
+# shape (wells, targets).
+def common_pressure(reservoir_type, params, Pws, target_rate, tolerance=1e-6, max_iterations=50):
+    Pws = np.asarray(Pws, dtype=float)
+    valid = np.isfinite(well_rates(reservoir_type, params, Pws, 0.0)[:, 0])
+    params, Pws = params[valid], Pws[valid]
+    target_rate = np.atleast_1d(np.asarray(target_rate, dtype=float))
+
+    low = np.zeros(len(target_rate))
+    high = np.full(len(target_rate), Pws.max(initial=0))
+    feasible = target_rate <= field_rate(reservoir_type, params, Pws, low)
+    Pwf = np.where(target_rate <= 0, high, high / 2)
+
+    # Targets still iterating; converged ones drop out so later passes get cheaper
+    active = np.flatnonzero(feasible)
+    for _ in range(max_iterations):
+        x = Pwf[active]
+        residual = field_rate(reservoir_type, params, Pws, x) - target_rate[active]
+        converged = np.abs(residual) <= tolerance * np.maximum(target_rate[active], 1)
+        active, x, residual = active[~converged], x[~converged], residual[~converged]
+        if not len(active):
+            break
+
+        # The field rate decreases with pressure: a positive residual means the pressure is too low
+        low[active] = np.where(residual > 0, x, low[active])
+        high[active] = np.where(residual > 0, high[active], x)
+        slope = well_rates_slope(reservoir_type, params, Pws, x).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x - residual / slope
+        inside = np.isfinite(newton) & (newton > low[active]) & (newton < high[active])
+        Pwf[active] = np.where(inside, newton, (low[active] + high[active]) / 2)
+
+    Pwf = np.where(feasible, Pwf, np.nan)
+    rates = np.full((len(valid), len(target_rate)), np.nan)
+    rates[valid] = well_rates(reservoir_type, params, Pws, Pwf)
+    rates[:, ~feasible] = np.nan
+    return Pwf, rates
+
+# Field IPR of a coefficients table sampled at `points` common pressures from 0 to the highest reservoir
+# pressure: returns (Pwf, total rate)
+def field_IPR(coefficients_df, reservoir_type, points=200):
+    params = coefficients_params(reservoir_type, coefficients_df)
+    Pws = coefficients_df['Pres (bar)'].to_numpy(dtype=float)
+    Pwf = np.linspace(0, np.fmax.reduce(Pws, initial=0), points)
+    return Pwf, field_rate(reservoir_type, params, Pws, Pwf)
+
+# Common pressure and per-well allocation of a coefficients table for one or more target total rates
+def allocate_rate(coefficients_df, reservoir_type, target_rate, **solver_settings):
+    params = coefficients_params(reservoir_type, coefficients_df)
+    Pws = coefficients_df['Pres (bar)'].to_numpy(dtype=float)
+    return common_pressure(reservoir_type, params, Pws, target_rate, **solver_settings)
@@ -0,0 +1,494 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ipr.models import (calculate_AOF, curve_IPR_Vogel, error_function, error_function_vogel, jacobian_IPR,
+                        jacobian_Vogel, residuals_IPR, residuals_Vogel)
+from ipr.wells import WellIndex
+
+# Execution backends for the per-well solvers (minimize and least_squares)
+EXECUTORS = {'threads': ThreadPoolExecutor, 'processes': ProcessPoolExecutor}
+
+# Below this number of wells the per-well solvers always run serially
+MIN_PARALLEL_WELLS = 32
+
+# Fixed starting point of the per-well solvers when no warm start is given
+DEFAULT_GUESS = {'Gas': [1.65e-2, 4.17e-1], 'Oil': [10]}
+
+# Percentiles reported by calculate_coefficients(bootstrap=...), as P10/P50/P90 columns
+BOOTSTRAP_PERCENTILES = (10, 50, 90)
+
+# Working memory of bootstrap_params per resampled test point (resampled arrays and refinement temporaries)
+BOOTSTRAP_BYTES_PER_TEST = 400
+
+# Columns added to the coefficients table by calculate_coefficients(instrument=True)
+DIAGNOSTIC_COLUMNS = ['Fit time (s)', 'Function evaluations', 'Iterations', 'Final loss', 'Converged',
+                      'Solver message']
+
+# Objective of error_function for every well at once (without the 1000 scaling)
+def forchheimer_log_loss(a, b, Q, Pwf, Pws, codes, n_wells):
+    # Trial steps of refine_forchheimer can overflow u, they are rejected by their infinite loss
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        u = Pws[codes] ** 2 - a[codes] * Q ** 2 - b[codes] * Q
+        errors = np.log(np.abs(u)) - np.log(np.abs(Pwf ** 2))
+    return np.bincount(codes, weights=errors ** 2, minlength=n_wells), u, errors
+
+# Grouped sums of each well that define its linear Forchheimer least squares problem:
+# Q^4, Q^3, Q^2, Q^2*dP2 and Q*dP2, with dP2 = Pws^2 - Pwf^2
+def forchheimer_sums(Q, Pwf, Pws, codes, n_wells):
+    Q = np.asarray(Q, dtype=float)
+    dP2 = Pws[codes] ** 2 - np.asarray(Pwf, dtype=float) ** 2
+    return np.vstack([np.bincount(codes, weights=weights, minlength=n_wells)
+                      for weights in (Q ** 4, Q ** 3, Q ** 2, Q ** 2 * dP2, Q * dP2)])
+
+# Closed-form non-negative least squares solution for (a, b) from the sums of forchheimer_sums.
+# Pws^2 - Pwf^2 = a*Q^2 + b*Q is linear in (a, b), so each well is a 2x2 problem: the unconstrained
+# solution and the two bound solutions (b = 0, a = 0) are compared and the best feasible one is kept.
+def solve_forchheimer_sums(sums):
+    s22, s21, s11, t2, t1 = sums
+    n_wells = len(s22)
+
+    # Candidate solutions: unconstrained, b = 0 and a = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = s22 * s11 - s21 ** 2
+        a_free = (t2 * s11 - t1 * s21) / det
+        b_free = (s22 * t1 - s21 * t2) / det
+        a_only = np.maximum(t2 / s22, 0)
+        b_only = np.maximum(t1 / s11, 0)
+
+    # Sum of squared residuals up to a constant, used to pick the best feasible candidate
+    def sse(a, b):
+        return a ** 2 * s22 + 2 * a * b * s21 + b ** 2 * s11 - 2 * a * t2 - 2 * b * t1
+
+    candidates_a = np.vstack([a_free, a_only, np.zeros(n_wells)])
+    candidates_b = np.vstack([b_free, np.zeros(n_wells), b_only])
+    feasible = (candidates_a >= 0) & (candidates_b >= 0) & np.isfinite(candidates_a) & np.isfinite(candidates_b)
+    with np.errstate(invalid='ignore'):
+        scores = np.where(feasible, sse(candidates_a, candidates_b), np.inf)
+    best = np.argmin(scores, axis=0)
+    a = np.nan_to_num(candidates_a[best, np.arange(n_wells)])
+    b = np.nan_to_num(candidates_b[best, np.arange(n_wells)])
+    return a, b
+
+# Log-space refinement of (a, b) on the objective of error_function for all wells together:
+# Gauss-Newton steps (full and along each coefficient, so wells sitting on a bound can still move)
+# with backtracking, keeping the best one per well
+def refine_forchheimer(a, b, Q, Pwf, Pws, codes, n_wells, iterations=10):
+    Q = np.asarray(Q, dtype=float)
+    Pwf = np.asarray(Pwf, dtype=float)
+
+    def group_sum(weights):
+        return np.bincount(codes, weights=weights, minlength=n_wells)
+
+    for _ in range(iterations):
+        loss, u, errors = forchheimer_log_loss(a, b, Q, Pwf, Pws, codes, n_wells)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ja, jb = -Q ** 2 / u, -Q / u
+            ja, jb, r = np.nan_to_num(ja), np.nan_to_num(jb), np.nan_to_num(errors)
+        haa, hab, hbb = group_sum(ja * ja), group_sum(ja * jb), group_sum(jb * jb)
+        ga, gb = group_sum(ja * r), group_sum(jb * r)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            det = haa * hbb - hab ** 2
+            directions = [
+                (np.nan_to_num(-(hbb * ga - hab * gb) / det), np.nan_to_num(-(haa * gb - hab * ga) / det)),
+                (np.nan_to_num(-ga / haa), np.zeros(n_wells)),
+                (np.zeros(n_wells), np.nan_to_num(-gb / hbb)),
+            ]
+
+        best_loss, best_a, best_b = loss, a, b
+        for step_a, step_b in directions:
+            for scale in (1.0, 0.5, 0.25, 0.125):
+                a_try = np.maximum(a + scale * step_a, 0)
+                b_try = np.maximum(b + scale * step_b, 0)
+                loss_try = forchheimer_log_loss(a_try, b_try, Q, Pwf, Pws, codes, n_wells)[0]
+                accept = loss_try < best_loss
+                best_loss = np.where(accept, loss_try, best_loss)
+                best_a, best_b = np.where(accept, a_try, best_a), np.where(accept, b_try, best_b)
+        if not (best_loss < loss).any():
+            break
+        a, b = best_a, best_b
+
+    return a, b
+
+# Batched Forchheimer fit for all wells at once: closed-form linear fit, optionally refined in log space
+def fit_forchheimer_batch(Q, Pwf, Pws, codes, n_wells, refine_iterations=10):
+    a, b = solve_forchheimer_sums(forchheimer_sums(Q, Pwf, Pws, codes, n_wells))
+    return refine_forchheimer(a, b, Q, Pwf, Pws, codes, n_wells, iterations=refine_iterations)
+
+# Grouped sums of each well that define its Vogel fit: sum of log(Q) - log(Vogel shape factor)
+# over the flowing points, and the number of flowing points.
+# Shut-in points (Q = 0) would give log(0), so they are left out of the fit.
+def vogel_sums(Q, Pwf, Pws, codes, n_wells):
+    Q = np.asarray(Q, dtype=float)
+    shape = curve_IPR_Vogel(np.asarray(Pwf, dtype=float), Pws[codes], 1.0)
+
+    valid = (Q > 0) & (shape > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_Qmax = np.where(valid, np.log(Q) - np.log(shape), 0.0)
+    return np.vstack([np.bincount(codes, weights=log_Qmax, minlength=n_wells),
+                      np.bincount(codes, weights=valid, minlength=n_wells)])
+
+# error_function_vogel only depends on Qmax through log(Qmax), so its minimum is in closed form:
+# log(Qmax) = mean(log(Q) - log(Vogel shape factor)) over the flowing points of each well
+def solve_vogel_sums(sums):
+    log_sum, count = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Qmax = np.exp(log_sum / count)
+    return np.where(count > 0, Qmax, np.nan)
+
+# Batched Vogel fit for all wells at once
+def fit_vogel_batch(Q, Pwf, Pws, codes, n_wells):
+    return solve_vogel_sums(vogel_sums(Q, Pwf, Pws, codes, n_wells))
+
+# Bootstrap of the batch fit: the tests of every well are resampled with replacement `replicates` times
+# and all resamples are fitted together as one batch, each resample being a well of its own.
+# Wells are processed in blocks sized so that replicates x tests of a block stay within memory_budget
+# bytes. The random draws are taken test by test in well order (all resamples of a test at once), so a
+# seed gives the same resamples whatever the block size. Returns the percentiles (BOOTSTRAP_PERCENTILES)
+# of the parameters of every well, shape (percentiles, wells, parameters): (a, b, AOF) for gas and
+# (Qmax,) for oil, in solver units.
+def bootstrap_params(reservoir_type, index, replicates=200, refine=True, memory_budget=256_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    n_wells = len(index)
+    results = np.full((len(BOOTSTRAP_PERCENTILES), n_wells, 3 if reservoir_type == 'Gas' else 1), np.nan)
+    block_tests = max(int(memory_budget // (replicates * BOOTSTRAP_BYTES_PER_TEST)), 1)
+
+    start = 0
+    while start < n_wells:
+        stop = max(np.searchsorted(index.offsets, index.offsets[start] + block_tests, side='right') - 1, start + 1)
+        stop = min(stop, n_wells)
+        block = index.subset(np.arange(start, stop))
+        n_block = len(block)
+        codes = block.codes()
+        counts = np.diff(block.offsets)
+
+        # Row drawn for every test of every resample, within the tests of its own well
+        draws = rng.random((len(codes), replicates)).T
+        rows = block.offsets[codes] + (draws * counts[codes]).astype(int)
+        resample_codes = (codes + n_block * np.arange(replicates)[:, None]).ravel()
+        Q, Pwf = block.Q[rows].ravel(), block.Pwf[rows].ravel()
+        Pws = np.tile(block.Pws, replicates)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            if reservoir_type == 'Gas':
+                a, b = fit_forchheimer_batch(Q, Pwf, Pws, resample_codes, n_block * replicates,
+                                             refine_iterations=10 if refine else 0)
+                params = np.stack([a, b, calculate_AOF(a, b, Pws)], axis=-1)
+            else:
+                params = fit_vogel_batch(Q, Pwf, Pws, resample_codes, n_block * replicates)[:, None]
+
+        # Nearest-rank percentiles over the resamples that could be fitted (NaN sorts last). Interpolating
+        # would turn resamples with an infinite AOF (a = b = 0) into NaN.
+        params = np.sort(params.reshape(replicates, n_block, -1), axis=0)
+        fitted = np.isfinite(params).sum(axis=0) + np.isinf(params).sum(axis=0)
+        for i, percentile in enumerate(BOOTSTRAP_PERCENTILES):
+            rank = np.round(percentile / 100 * (fitted - 1)).astype(int)
+            values = np.take_along_axis(params, np.maximum(rank, 0)[None], axis=0)[0]
+            results[i, start:stop] = np.where(fitted > 0, values, np.nan)
+        start = stop
+
+    return results
+
+# Bootstrap percentile columns of the coefficients table, in the units of coefficients_frame
+def bootstrap_frame(reservoir_type, percentiles):
+    if reservoir_type == 'Gas':
+        columns = [('a (bar2/(m3/d)2)', 0, 1e-6), ('b (bar2/m3/d)', 1, 1e-3), ('AOF (km3/d)', 2, 1)]
+    else:
+        columns = [('Qmax (m3/d)', 0, 1)]
+    return pd.DataFrame({f'{name} P{percentile}': percentiles[i, :, j] * scale
+                         for name, j, scale in columns for i, percentile in enumerate(BOOTSTRAP_PERCENTILES)})
+
+# Fit one chunk of wells, one by one.
+# solver='minimize' runs scipy's minimize on error_function / error_function_vogel with finite-difference
+# gradients; solver='least_squares' runs scipy's least_squares on their residuals with exact Jacobians
+# (residuals_IPR / residuals_Vogel), which needs fewer evaluations and behaves better near the log
+# singularity (Pws^2 - a*Q^2 - b*Q close to 0).
+# A chunk is only made of NumPy arrays (rows sorted by well plus row offsets), so it is cheap to
+# send to worker processes. Returns one row of fitted parameters per well, one row of solver
+# statistics per well (wall time, function evaluations, iterations, final loss, success) and the
+# solver messages.
+# initial optionally gives the starting parameters of every well (see initial_params); wells without
+# finite starting parameters start from DEFAULT_GUESS. Oil wells are fitted on their flowing points only,
+# as in vogel_sums; a well without any gets NaN.
+def fit_chunk(reservoir_type, Pws, offsets, Q, Pwf, solver='minimize', initial=None):
+    # scipy is only needed by the per-well solvers, so it isn't imported with the package
+    from scipy.optimize import least_squares, minimize
+
+    params = []
+    stats = np.empty((len(Pws), 5))
+    messages = []
+    for i in range(len(Pws)):
+        rows = slice(offsets[i], offsets[i + 1])
+        start = time.perf_counter()
+        well_Q, well_Pwf = Q[rows], Pwf[rows]
+        if reservoir_type == 'Oil':
+            # Shut-in points (Q = 0) would give log(0), they are left out of the fit as in vogel_sums
+            flowing = (well_Q > 0) & (curve_IPR_Vogel(well_Pwf, Pws[i], 1.0) > 0)
+            well_Q, well_Pwf = well_Q[flowing], well_Pwf[flowing]
+            if not len(well_Q):
+                params.append([np.nan])
+                stats[i] = (time.perf_counter() - start, 0, 0, np.nan, False)
+                messages.append("No flowing test")
+                continue
+
+        guess = DEFAULT_GUESS[reservoir_type]
+        if initial is not None and np.isfinite(initial[i]).all():
+            guess = np.maximum(initial[i], 0)
+
+        if solver == 'least_squares':
+            if reservoir_type == 'Gas':
+                result = least_squares(residuals_IPR, guess, jac=jacobian_IPR, bounds=(0, np.inf), x_scale='jac',
+                                       args=(well_Q, well_Pwf, Pws[i]))
+            else:
+                result = least_squares(residuals_Vogel, guess, jac=jacobian_Vogel, bounds=(0, np.inf),
+                                       args=(well_Pwf, well_Q, Pws[i]))
+            params.append(result.x)
+            # least_squares has no iteration count, each iteration evaluates the Jacobian once
+            stats[i] = (time.perf_counter() - start, result.nfev, result.njev, 2000 * result.cost, result.success)
+            messages.append(str(result.message))
+            continue
+
+        if reservoir_type == 'Gas':
+            well_data = {"Rate (km3/d)": well_Q, "BHP (bar)": well_Pwf, "Pres (bar)": Pws[i]}
+            initial_guess = [guess[0], guess[1], Pws[i]]  # Initial guess for optimization
+            bounds = [(0, np.inf), (0, np.inf), (Pws[i] - 1e-9, Pws[i] + 1e-9)]  # Bounds for parameters
+            result = minimize(error_function, initial_guess, args=(well_data,), bounds=bounds)
+            params.append(result.x[:2])
+
+        elif reservoir_type == 'Oil':
+            initial_guess = guess  # Initial guess for Qmax
+            bounds = [(0, np.inf)]  # Define bounds for Qmax
+            result = minimize(error_function_vogel, initial_guess, args=(well_Pwf, well_Q, Pws[i]), bounds=bounds)
+            params.append(result.x)
+
+        stats[i] = (time.perf_counter() - start, result.nfev, result.nit, result.fun, result.success)
+        messages.append(str(result.message))
+
+    return np.array(params).reshape(len(Pws), -1), stats, messages
+
+# Run fit_chunk over chunks of wells, serially or on a pool of threads or processes.
+# Executor.map keeps the chunk order, so results always come back in well order.
+# Small fields fall back to serial, where starting a pool would cost more than it saves.
+# Returns the fitted parameters and the solver diagnostics of every well.
+def run_chunks(reservoir_type, Pws, offsets, Q, Pwf, solver='minimize', backend='serial', max_workers=None,
+               chunk_size=None, initial=None):
+    n_wells = len(Pws)
+    max_workers = max_workers or os.cpu_count() or 1
+    if n_wells < MIN_PARALLEL_WELLS or max_workers == 1:
+        backend = 'serial'
+    if chunk_size is None:
+        chunk_size = max(1, -(-n_wells // (max_workers * 4)))
+
+    chunks = []
+    for start in range(0, n_wells, chunk_size):
+        stop = min(start + chunk_size, n_wells)
+        rows = slice(offsets[start], offsets[stop])
+        chunks.append((reservoir_type, Pws[start:stop], offsets[start:stop + 1] - offsets[start], Q[rows], Pwf[rows],
+                       solver, None if initial is None else initial[start:stop]))
+
+    if backend == 'serial':
+        results = [fit_chunk(*chunk) for chunk in chunks]
+    elif backend in EXECUTORS:
+        with EXECUTORS[backend](max_workers=max_workers) as executor:
+            results = list(executor.map(fit_chunk, *zip(*chunks)))
+    else:
+        raise ValueError(f"Unknown backend '{backend}', expected 'serial', 'threads' or 'processes'")
+
+    if not results:
+        return np.empty((0, 2 if reservoir_type == 'Gas' else 1)), diagnostics_frame(np.empty((0, 5)), [])
+    params, stats, messages = zip(*results)
+    return np.concatenate(params), diagnostics_frame(np.concatenate(stats), sum(messages, []))
+
+# Solver diagnostics of every well, as added to the coefficients table by calculate_coefficients(instrument=True)
+def diagnostics_frame(stats, messages):
+    diagnostics = pd.DataFrame(stats, columns=DIAGNOSTIC_COLUMNS[:5])
+    diagnostics['Converged'] = diagnostics['Converged'].astype(bool)
+    diagnostics['Solver message'] = messages
+    return diagnostics
+
+# Diagnostics of the batch solvers. There is no per-well solver run, so the batch time is spread evenly
+# over the wells and the iterations are those of the (shared) log-space refinement; the final loss is
+# the objective of error_function / error_function_vogel, 1000 scaling included.
+def batch_diagnostics(reservoir_type, index, params, elapsed, iterations):
+    codes = index.codes()
+    n_wells = len(index)
+    if reservoir_type == 'Gas':
+        loss = forchheimer_log_loss(params[:, 0], params[:, 1], index.Q, index.Pwf, index.Pws, codes, n_wells)[0]
+        message = 'closed form + log refinement' if iterations else 'closed form'
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.log(curve_IPR_Vogel(index.Pwf, index.Pws[codes], params[codes, 0])) - np.log(index.Q)
+            valid = np.isfinite(errors)
+        loss = np.bincount(codes, weights=np.where(valid, errors, 0) ** 2, minlength=n_wells)
+        message = 'closed form'
+
+    loss = loss * 1000
+    converged = np.isfinite(params).all(axis=1) & np.isfinite(loss)
+    stats = np.column_stack([np.full(n_wells, elapsed / max(n_wells, 1)), np.zeros(n_wells),
+                             np.full(n_wells, iterations), loss, converged])
+    return diagnostics_frame(stats, [message] * n_wells)
+
+# Parameters of the wells of a WellIndex taken from a previous coefficients table (e.g. an exported
+# coefficients CSV), matched by well name and converted back to solver units. Wells missing from the
+# table get NaN.
+def prior_params(reservoir_type, index, coefficients_df):
+    prior = coefficients_df.assign(Well=coefficients_df['Well'].astype(str)).drop_duplicates('Well').set_index('Well')
+    return coefficients_params(reservoir_type, prior.reindex(pd.Index(index.wells).astype(str)))
+
+# Starting parameters of the per-well solvers for every well of a WellIndex:
+# warm_start=None uses DEFAULT_GUESS, warm_start='linear' a cheap closed-form pre-fit of every well (the
+# batch solver without refinement) and a DataFrame the coefficients of a previous run (see prior_params).
+def initial_params(reservoir_type, index, warm_start=None):
+    if warm_start is None:
+        return None
+    if isinstance(warm_start, pd.DataFrame):
+        return prior_params(reservoir_type, index, warm_start)
+    if warm_start != 'linear':
+        raise ValueError(f"Unknown warm start '{warm_start}', expected None, 'linear' or a coefficients table")
+
+    codes = index.codes()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if reservoir_type == 'Gas':
+            return np.column_stack(fit_forchheimer_batch(index.Q, index.Pwf, index.Pws, codes, len(index),
+                                                         refine_iterations=0))
+        return fit_vogel_batch(index.Q, index.Pwf, index.Pws, codes, len(index))[:, None]
+
+# Warm start actually used by the per-well solvers. least_squares follows the log|u| loss of a gas well
+# across u = Pws^2 - aQ^2 - bQ = 0 from the fixed default guess and can end in a spurious minimum with
+# u < 0 at some tests, so it starts from the closed-form linear fit unless a warm start is given.
+def solver_warm_start(reservoir_type, solver, warm_start):
+    if warm_start is None and solver == 'least_squares' and reservoir_type == 'Gas':
+        return 'linear'
+    return warm_start
+
+# Fitted parameters of every well of a WellIndex, one row per well: (a, b) for gas and (Qmax,) for oil,
+# and their solver diagnostics (see DIAGNOSTIC_COLUMNS). warm_start seeds the per-well solvers (see
+# initial_params); the batch solver is closed form and doesn't need one.
+def fit_params(reservoir_type, index, solver='batch', refine=True, backend='serial', max_workers=None, chunk_size=None,
+               warm_start=None):
+    if solver == 'batch':
+        start = time.perf_counter()
+        codes = index.codes()
+        iterations = 10 if refine and reservoir_type == 'Gas' else 0
+        if reservoir_type == 'Gas':
+            a_fit, b_fit = fit_forchheimer_batch(index.Q, index.Pwf, index.Pws, codes, len(index),
+                                                 refine_iterations=iterations)
+            params = np.column_stack([a_fit, b_fit])
+        else:
+            params = fit_vogel_batch(index.Q, index.Pwf, index.Pws, codes, len(index))[:, None]
+        return params, batch_diagnostics(reservoir_type, index, params, time.perf_counter() - start, iterations)
+
+    if solver not in ('minimize', 'least_squares'):
+        raise ValueError(f"Unknown solver '{solver}', expected 'batch', 'minimize' or 'least_squares'")
+    initial = initial_params(reservoir_type, index, solver_warm_start(reservoir_type, solver, warm_start))
+    return run_chunks(reservoir_type, index.Pws, index.offsets, index.Q, index.Pwf, solver=solver, backend=backend,
+                      max_workers=max_workers, chunk_size=chunk_size, initial=initial)
+
+# Same as fit_params, but wells whose test data, model and solver settings are found in the cache
+# are not refit (their diagnostics say 'cached'). The per-well solvers can end in a different local
+# minimum from a different start, so the starting parameters of a warm start are part of the key.
+def fit_params_cached(cache, reservoir_type, index, solver='batch', refine=True, warm_start=None,
+                      **backend_settings):
+    settings = {'solver': solver, 'refine': refine} if solver == 'batch' else {'solver': solver}
+    initial = None if solver == 'batch' else initial_params(reservoir_type, index,
+                                                            solver_warm_start(reservoir_type, solver, warm_start))
+
+    def well_settings(i):
+        return settings if initial is None else dict(settings, initial=tuple(initial[i].tolist()))
+
+    keys = [cache.key(reservoir_type, index.Pws[i], *index.test_data(i), **well_settings(i)) for i in range(len(index))]
+    params = np.empty((len(index), 2 if reservoir_type == 'Gas' else 1))
+    diagnostics = diagnostics_frame(np.tile([0, 0, 0, np.nan, 1], (len(index), 1)), ['cached'] * len(index))
+    missing = []
+    for i, key in enumerate(keys):
+        cached = cache.get(key)
+        if cached is None:
+            missing.append(i)
+        else:
+            params[i] = cached
+
+    if missing:
+        missing = np.array(missing)
+        fitted, fitted_diagnostics = fit_params(reservoir_type, index.subset(missing), solver=solver, refine=refine,
+                                                warm_start=warm_start, **backend_settings)
+        params[missing] = fitted
+        diagnostics.iloc[missing] = fitted_diagnostics.to_numpy()
+        for i, well_params in zip(missing, fitted):
+            cache.put(keys[i], well_params)
+
+    return params, diagnostics
+
+# Coefficients table from the fitted parameters of every well (plus the number of shut-in points of
+# every well for oil)
+def coefficients_frame(reservoir_type, wells, Pws, params, shut_in=None):
+    if reservoir_type == 'Gas':
+        a_fit, b_fit = params[:, 0], params[:, 1]
+        return pd.DataFrame({
+            'Well': wells,
+            'Pres (bar)': Pws,
+            'a (bar2/(m3/d)2)': a_fit / 1e6,
+            'b (bar2/m3/d)': b_fit / 1000,
+            'AOF (km3/d)': calculate_AOF(a_fit, b_fit, Pws)
+        })
+
+    return pd.DataFrame({
+        'Well': wells,
+        'Pres (bar)': Pws,
+        'Qmax (m3/d)': params[:, 0],
+        'Shut-in points': np.asarray(shut_in, dtype=int)
+    })
+
+# Fitted parameters of every well back from a coefficients table, in solver units (the inverse of
+# coefficients_frame). Values that aren't numbers (e.g. from an edited CSV) become NaN.
+def coefficients_params(reservoir_type, coefficients_df):
+    if reservoir_type == 'Gas':
+        return np.column_stack([pd.to_numeric(coefficients_df['a (bar2/(m3/d)2)'], errors='coerce').to_numpy() * 1e6,
+                                pd.to_numeric(coefficients_df['b (bar2/m3/d)'], errors='coerce').to_numpy() * 1000])
+    return pd.to_numeric(coefficients_df['Qmax (m3/d)'], errors='coerce').to_numpy()[:, None]
+
+# Calculate coefficients for each well. data is the multiwell test table or a WellIndex built from it;
+# row i of the result is well i of the index.
+# solver='batch' fits all wells at once, solver='minimize' runs scipy's minimize per well and
+# solver='least_squares' runs scipy's least_squares with exact Jacobians per well, on the selected backend
+# ('serial', 'threads' or 'processes'). With a FitCache only the wells that changed since the last run
+# are refit. warm_start='linear' or a previous coefficients table seeds the per-well solvers
+# (see initial_params). instrument=True adds the solver diagnostics of every
+# well (DIAGNOSTIC_COLUMNS) to the table. bootstrap=B adds P10/P50/P90 columns of every coefficient from
+# B resamples of each well's tests, fitted with the batch solver whatever the solver setting, using at
+# most about bootstrap_memory bytes at a time (see bootstrap_params).
+def calculate_coefficients(data, reservoir_type, solver='batch', refine=True, backend='serial', max_workers=None,
+                           chunk_size=None, cache=None, instrument=False, warm_start=None, bootstrap=0,
+                           bootstrap_memory=256_000_000):
+    index = data if isinstance(data, WellIndex) else WellIndex.from_data(data, reservoir_type)
+    settings = dict(solver=solver, refine=refine, backend=backend, max_workers=max_workers, chunk_size=chunk_size,
+                    warm_start=warm_start)
+
+    if cache is None:
+        params, diagnostics = fit_params(reservoir_type, index, **settings)
+    else:
+        params, diagnostics = fit_params_cached(cache, reservoir_type, index, **settings)
+
+    # Shut-in points (Rate = 0) can't be fitted in log space, they are counted for the user
+    shut_in = np.bincount(index.codes(), weights=index.Q == 0, minlength=len(index))
+    coefficients_df = coefficients_frame(reservoir_type, index.wells, index.Pws, params, shut_in)
+    if bootstrap:
+        percentiles = bootstrap_params(reservoir_type, index, replicates=bootstrap, refine=refine,
+                                       memory_budget=bootstrap_memory)
+        coefficients_df = pd.concat([coefficients_df, bootstrap_frame(reservoir_type, percentiles)], axis=1)
+    if instrument:
+        coefficients_df = pd.concat([coefficients_df, diagnostics], axis=1)
+    return coefficients_df
+
+# Summary of a run with solver diagnostics: total solver time, mean iterations per well, number of
+# wells that failed to converge and the slowest wells
+def solver_summary(coefficients_df, slowest=10):
+    return {
+        'Total time (s)': coefficients_df['Fit time (s)'].sum(),
+        'Wells': len(coefficients_df),
+        'Mean iterations': coefficients_df['Iterations'].mean(),
+        'Failures': int((~coefficients_df['Converged']).sum()),
+        'Slowest wells': coefficients_df.nlargest(slowest, 'Fit time (s)')
+    }
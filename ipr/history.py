@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from ipr.fitting import coefficients_frame, fit_vogel_batch, refine_forchheimer, solve_forchheimer_sums
+from ipr.wells import group_wells, rate_column
+
+# Working memory of calculate_history per row of a window (row indices, gathered tests and the temporaries
+# of the gas refinement, measured at about 120 bytes; the oil fit needs half of it)
+HISTORY_BYTES_PER_TEST = 128
+
+# Calendar windows of calculate_history: pandas period frequencies
+CALENDAR_FREQUENCIES = {'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+# Windows of the tests of every well, over the rows sorted by well then date (days since the first test
+# of the field in t). Rolling windows are [start, start + window) days, with starts every step days from
+# the first test of the field; calendar windows are the periods (month, quarter, year) of the tests.
+# Only windows with at least one test are kept. Returns the well code, start and end dates of every
+# window and its rows lo:hi.
+def history_windows(codes, dates, window=180, step=None, calendar=None):
+    if calendar is not None:
+        periods = pd.PeriodIndex(dates, freq=CALENDAR_FREQUENCIES.get(calendar, calendar))
+        ordinals = periods.asi8
+        lo = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (ordinals[1:] != ordinals[:-1])])
+        hi = np.r_[lo[1:], len(codes)]
+        first = periods[lo]
+        return codes[lo], first.start_time.normalize(), first.end_time.normalize(), lo, hi
+
+    step = step or window
+    origin = dates.min()
+    t = ((dates - origin) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+    # Sort key of the rows: one block of span days per well
+    span = int(t.max()) + window + 1
+    key = codes * span + t
+
+    n_wells = codes.max() + 1
+    well_rows = np.searchsorted(codes, np.arange(n_wells + 1))
+    first_t, last_t = t[well_rows[:-1]], t[well_rows[1:] - 1]
+    # Windows [k * step, k * step + window) that contain a test of the well
+    k_first = np.maximum(-(-(first_t - window + 1) // step), 0)
+    k_last = last_t // step
+    counts = k_last - k_first + 1
+    window_codes = np.repeat(np.arange(n_wells), counts)
+    k = np.repeat(k_first - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(counts.sum())
+    starts = k * step
+    lo = np.searchsorted(key, window_codes * span + starts)
+    hi = np.searchsorted(key, window_codes * span + starts + window)
+
+    tested = hi > lo
+    window_codes, starts, lo, hi = window_codes[tested], starts[tested], lo[tested], hi[tested]
+    start_dates = origin.normalize() + pd.to_timedelta(starts, unit='D')
+    return window_codes, start_dates, start_dates + pd.Timedelta(days=window - 1), lo, hi
+
+# Rows lo:hi of every window as one flat array of row indices, with the window of each
+def expand_windows(lo, hi):
+    lengths = hi - lo
+    window_codes = np.repeat(np.arange(len(lo)), lengths)
+    rows = np.repeat(lo - np.r_[0, np.cumsum(lengths)[:-1]], lengths) + np.arange(lengths.sum())
+    return rows, window_codes
+
+# Blocks of consecutive windows whose rows add up to at most block_rows (at least one window per block)
+def window_blocks(lo, hi, block_rows):
+    ends = np.cumsum(hi - lo)
+    start = 0
+    while start < len(lo):
+        offset = ends[start - 1] if start else 0
+        stop = max(int(np.searchsorted(ends, offset + block_rows, side='right')), start + 1)
+        yield slice(start, stop)
+        start = stop
+
+# Differences of prefix sums: sums of the rows lo:hi of every window, for every row of values. The
+# prefix sums restart at the first row of every well (codes of the rows sorted by well), so the sums of a
+# well don't lose their precision to the much larger sums of the wells before it.
+def window_sums(values, codes, lo, hi):
+    prefix = pd.DataFrame(values.T).groupby(codes).cumsum().to_numpy().T
+    prefix = np.hstack([np.zeros((len(values), 1)), prefix])
+    first_row = np.r_[True, codes[1:] != codes[:-1]]
+    before = np.where(first_row[np.minimum(lo, len(codes) - 1)], 0, prefix[:, lo])
+    return prefix[:, hi] - before
+
+# IPR history of every well: the tests of a multiwell table with a Date column are fitted over rolling
+# windows (window days, a new one every step days, step = window for back-to-back windows) or calendar
+# windows (calendar='month', 'quarter' or 'year'), each with the reservoir pressure of its first test.
+# All windows of all wells are fitted as one batch, each window being a well of its own. For gas the
+# linear Forchheimer sums of every window are differences of prefix sums of per-test terms that don't
+# depend on Pws (Pws^2 - Pwf^2 = a*Q^2 + b*Q is expanded), so overlapping windows share them and the
+# closed-form fit is O(tests + windows) whatever the overlap; refine=True then refines all windows in
+# log space over their rows. Oil windows are fitted in closed form over their rows, the Vogel shape
+# factor depends on the reservoir pressure of each window. Work over the rows of the windows is done in
+# blocks of windows using at most about memory_budget bytes.
+# Windows with fewer than min_tests flowing tests are left out (default: 2 for gas, a and b are only
+# unique from two tests, 1 for oil). Tests without a valid date or a well name are ignored.
+# Returns one row per (well, window): Well, Window start, Window end, Tests and the coefficients columns
+# of calculate_coefficients.
+def calculate_history(data, reservoir_type, window=180, step=None, calendar=None, min_tests=None, refine=True,
+                      memory_budget=256_000_000):
+    if "Date" not in data.columns:
+        raise ValueError("History fitting needs a 'Date' column")
+    dates = pd.to_datetime(data["Date"], errors='coerce')
+    # Rows without a well name are left out, as in calculate_coefficients; they would also move the origin
+    # of the rolling windows
+    kept = (dates.notna() & data["Well"].notna()).to_numpy()
+    data, dates = data[kept], dates[kept]
+
+    wells, codes = group_wells(data)
+    order = np.lexsort((dates.to_numpy(), codes))
+    codes = codes[order]
+    dates = pd.DatetimeIndex(dates.to_numpy()[order])
+    Pres = data["Pres (bar)"].to_numpy(dtype=float)[order]
+    Pwf = data["BHP (bar)"].to_numpy(dtype=float)[order]
+    Q = data[rate_column(reservoir_type)].to_numpy(dtype=float)[order]
+
+    if not len(codes):
+        window_codes, starts, ends, lo, hi = (np.zeros(0, dtype=int), pd.DatetimeIndex([]), pd.DatetimeIndex([]),
+                                              np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+    else:
+        window_codes, starts, ends, lo, hi = history_windows(codes, dates, window, step, calendar)
+
+    flowing, shut_in = window_sums(np.vstack([Q > 0, Q == 0]).astype(float), codes, lo, hi)
+    if min_tests is None:
+        min_tests = 2 if reservoir_type == 'Gas' else 1
+    kept = flowing >= min_tests
+    window_codes, starts, ends, lo, hi = window_codes[kept], starts[kept], ends[kept], lo[kept], hi[kept]
+    shut_in = shut_in[kept]
+    Pws = Pres[lo]
+    n_windows = len(lo)
+    block_rows = max(int(memory_budget // HISTORY_BYTES_PER_TEST), 1)
+
+    if reservoir_type == 'Gas':
+        # Sums of Q^4, Q^3, Q^2, Q, Q^2*Pwf^2 and Q*Pwf^2 give the sums of forchheimer_sums for any Pws
+        s22, s21, s11, s1, u2, u1 = window_sums(np.vstack([Q ** 4, Q ** 3, Q ** 2, Q, Q ** 2 * Pwf ** 2,
+                                                           Q * Pwf ** 2]), codes, lo, hi)
+        a, b = solve_forchheimer_sums(np.vstack([s22, s21, s11, Pws ** 2 * s11 - u2, Pws ** 2 * s1 - u1]))
+        params = np.column_stack([a, b])
+        if refine:
+            for block in window_blocks(lo, hi, block_rows):
+                rows, row_windows = expand_windows(lo[block], hi[block])
+                refined = refine_forchheimer(a[block], b[block], Q[rows], Pwf[rows], Pws[block], row_windows,
+                                             len(lo[block]))
+                params[block] = np.column_stack(refined)
+    else:
+        params = np.full((n_windows, 1), np.nan)
+        for block in window_blocks(lo, hi, block_rows):
+            rows, row_windows = expand_windows(lo[block], hi[block])
+            params[block, 0] = fit_vogel_batch(Q[rows], Pwf[rows], Pws[block], row_windows, len(lo[block]))
+
+    history_df = coefficients_frame(reservoir_type, np.asarray(wells)[window_codes], Pws, params, shut_in)
+    history_df.insert(1, 'Window start', starts)
+    history_df.insert(2, 'Window end', ends)
+    history_df.insert(3, 'Tests', hi - lo)
+    return history_df
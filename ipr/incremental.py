@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from ipr.fitting import coefficients_frame, forchheimer_sums, solve_forchheimer_sums, solve_vogel_sums, vogel_sums
+from ipr.wells import rate_column
+
+# Running per-well sums of the test data, enough to fit every well in closed form: the normal-equation
+# sums of the linear Forchheimer fit for gas (see forchheimer_sums) and the exact Vogel fit for oil
+# (see vogel_sums). Tests can be added or retracted at any time and in any order; each test only
+# updates the sums of its own well, so refitting a well after a new test is O(1).
+# Memory grows with the number of wells, not the number of tests.
+# The reservoir pressure of a well is taken from its first test, as in calculate_coefficients.
+class WellStatistics:
+    def __init__(self, reservoir_type):
+        self.reservoir_type = reservoir_type
+        self.index = {}
+        self.wells = []
+        self.Pws = np.empty(0)
+        self.sums = np.empty((5 if reservoir_type == 'Gas' else 2, 0))
+        self.tests = np.empty(0)
+        self.shut_in = np.empty(0)
+
+    # Make room for at least n_wells wells, doubling the capacity so adding wells is amortized O(1)
+    def reserve(self, n_wells):
+        capacity = len(self.Pws)
+        if n_wells <= capacity:
+            return
+        grow = max(n_wells, 2 * capacity) - capacity
+        self.Pws = np.concatenate([self.Pws, np.full(grow, np.nan)])
+        self.sums = np.hstack([self.sums, np.zeros((self.sums.shape[0], grow))])
+        self.tests = np.concatenate([self.tests, np.zeros(grow)])
+        self.shut_in = np.concatenate([self.shut_in, np.zeros(grow)])
+
+    # Position of the well of every test, adding the wells seen for the first time
+    def positions(self, wells, Pres):
+        chunk_codes, chunk_wells = pd.factorize(wells)
+        first_rows = np.full(len(chunk_wells), len(wells))
+        np.minimum.at(first_rows, chunk_codes, np.arange(len(wells)))
+
+        new = [i for i, well in enumerate(chunk_wells) if well not in self.index]
+        if new:
+            self.reserve(len(self.wells) + len(new))
+            for i in new:
+                self.index[chunk_wells[i]] = len(self.wells)
+                self.wells.append(chunk_wells[i])
+            new_positions = [self.index[chunk_wells[i]] for i in new]
+            self.Pws[new_positions] = np.asarray(Pres, dtype=float)[first_rows[new]]
+
+        well_positions = np.array([self.index[well] for well in chunk_wells], dtype=int)
+        return well_positions[chunk_codes]
+
+    # Add (sign=1) or retract (sign=-1) a batch of tests. Tests without a well name are ignored, as in
+    # calculate_coefficients.
+    def add(self, wells, Pres, Pwf, Q, sign=1):
+        wells = np.asarray(wells)
+        named = ~pd.isna(wells)
+        if not named.all():
+            wells, Pres, Pwf, Q = (np.asarray(values)[named] for values in (wells, Pres, Pwf, Q))
+        if sign < 0:
+            unknown = [well for well in pd.unique(wells) if well not in self.index]
+            if unknown:
+                raise KeyError(f"Can't retract tests of unknown wells: {unknown[:5]}")
+        # Sums over the wells of the batch only, scattered into their columns: the cost of a batch
+        # doesn't depend on the number of wells already tracked
+        well_positions, codes = np.unique(self.positions(wells, Pres), return_inverse=True)
+        codes = codes.ravel()
+        n_wells = len(well_positions)
+        Pws = self.Pws[well_positions]
+        Q = np.asarray(Q, dtype=float)
+        Pwf = np.asarray(Pwf, dtype=float)
+
+        if self.reservoir_type == 'Gas':
+            self.sums[:, well_positions] += sign * forchheimer_sums(Q, Pwf, Pws, codes, n_wells)
+        else:
+            self.sums[:, well_positions] += sign * vogel_sums(Q, Pwf, Pws, codes, n_wells)
+        self.tests[well_positions] += sign * np.bincount(codes, minlength=n_wells)
+        self.shut_in[well_positions] += sign * np.bincount(codes, weights=Q == 0, minlength=n_wells)
+
+    # Add the tests of a multiwell table (or a chunk of one)
+    def update(self, data):
+        self.add(data["Well"].to_numpy(), data["Pres (bar)"].to_numpy(), data["BHP (bar)"].to_numpy(),
+                 data[rate_column(self.reservoir_type)].to_numpy())
+
+    # Retract the tests of a multiwell table, e.g. tests that turned out to be wrong
+    def retract(self, data):
+        self.add(data["Well"].to_numpy(), data["Pres (bar)"].to_numpy(), data["BHP (bar)"].to_numpy(),
+                 data[rate_column(self.reservoir_type)].to_numpy(), sign=-1)
+
+    # Add a single test and return the updated fit of its well
+    def append(self, well, Pres, Pwf, Q):
+        self.add([well], [Pres], [Pwf], [Q])
+        return self.fit(well)
+
+    # Current coefficients of one well, as a row of the coefficients table
+    def fit(self, well):
+        return self.coefficients_of(np.array([self.index[well]])).iloc[0].to_dict()
+
+    def coefficients_of(self, positions):
+        sums = self.sums[:, positions]
+        if self.reservoir_type == 'Gas':
+            params = np.column_stack(solve_forchheimer_sums(sums))
+        else:
+            params = solve_vogel_sums(sums)[:, None]
+        # Wells whose tests were all retracted have nothing to fit
+        params[self.tests[positions] <= 0] = np.nan
+
+        wells = np.array([self.wells[i] for i in positions], dtype=object)
+        return coefficients_frame(self.reservoir_type, wells, self.Pws[positions], params, self.shut_in[positions])
+
+    # Coefficients table of all wells, sorted by well as in calculate_coefficients
+    def coefficients(self):
+        coefficients_df = self.coefficients_of(np.arange(len(self.wells)))
+        return coefficients_df.sort_values('Well', ignore_index=True)
+
+    # Persist the accumulated state to a .npz file. Numeric and string well names keep their type (e.g. the
+    # integer wells of read_csv), other names are stored as strings; nothing is pickled.
+    def save(self, path):
+        n_wells = len(self.wells)
+        wells = np.array(self.wells)
+        if wells.dtype == object:
+            wells = wells.astype(str)
+        np.savez(path, reservoir_type=self.reservoir_type, wells=wells,
+                 Pws=self.Pws[:n_wells], sums=self.sums[:, :n_wells], tests=self.tests[:n_wells],
+                 shut_in=self.shut_in[:n_wells])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as state:
+            statistics = cls(str(state['reservoir_type']))
+            statistics.wells = state['wells'].tolist()
+            statistics.index = {well: i for i, well in enumerate(statistics.wells)}
+            statistics.Pws = state['Pws']
+            statistics.sums = state['sums']
+            statistics.tests = state['tests']
+            statistics.shut_in = state['shut_in']
+        return statistics
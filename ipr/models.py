@@ -0,0 +1,56 @@
+import numpy as np
+
+# Definition of the quadratic curve equation (Inflow Performance Relationship - IPR)
+def curve_IPR(Q, params):
+    a, b, Pws = params
+    return np.sqrt(-a * Q ** 2 - b * Q + Pws ** 2)
+
+# Definition of the curve equation (Vogel IPR)
+def curve_IPR_Vogel(Pwf, Pws, Qmax):
+    return Qmax * (1 - 0.2 * (Pwf / Pws) - 0.8 * (Pwf / Pws) ** 2)
+
+# Error function to minimize for quadratic IPR
+def error_function(params, data):
+    Q = data["Rate (km3/d)"]
+    Pwf = data["BHP (bar)"]
+    Pws = data["Pres (bar)"]
+    a, b, Pws = params
+    errors = np.log(np.abs(Pws ** 2 - a * Q ** 2 - b * Q)) - np.log(np.abs(Pwf ** 2))
+    squared_errors = np.sum(errors ** 2)
+    scaled_squared_errors = squared_errors * 1000
+    return scaled_squared_errors
+
+# Error function to minimize for Vogel IPR
+def error_function_vogel(params, Pwf, Q, Pws):
+    Qmax = params[0]
+    predicted_Q = curve_IPR_Vogel(Pwf, Pws, Qmax)
+    errors = np.log(predicted_Q) - np.log(Q)
+    squared_errors = np.sum(errors ** 2)
+    scaled_squared_errors = squared_errors * 1000
+    return scaled_squared_errors
+
+# Residuals of error_function with Pws fixed: error_function = 1000 * sum(residuals_IPR ** 2)
+def residuals_IPR(params, Q, Pwf, Pws):
+    a, b = params
+    return np.log(np.abs(Pws ** 2 - a * Q ** 2 - b * Q)) - np.log(np.abs(Pwf ** 2))
+
+# Exact Jacobian of residuals_IPR with respect to (a, b)
+def jacobian_IPR(params, Q, Pwf, Pws):
+    a, b = params
+    u = Pws ** 2 - a * Q ** 2 - b * Q
+    return np.column_stack([-Q ** 2 / u, -Q / u])
+
+# Residuals of error_function_vogel: error_function_vogel = 1000 * sum(residuals_Vogel ** 2)
+def residuals_Vogel(params, Pwf, Q, Pws):
+    return np.log(curve_IPR_Vogel(Pwf, Pws, params[0])) - np.log(Q)
+
+# Exact Jacobian of residuals_Vogel with respect to Qmax
+def jacobian_Vogel(params, Pwf, Q, Pws):
+    return np.full((len(Q), 1), 1 / params[0])
+
+# AOF of the Forchheimer IPR, i.e. the rate at Pwf = 0
+def calculate_AOF(a, b, Pws):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discriminant = b ** 2 + 4 * a * Pws ** 2
+        AOF = np.where(a > 0, (-b + np.sqrt(discriminant)) / (2 * a), Pws ** 2 / b)
+    return np.where(discriminant >= 0, AOF, np.nan)
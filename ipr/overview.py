@@ -0,0 +1,50 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from ipr.curves import CurveStore
+
+# Pressure/rate points per well of the overview curves
+OVERVIEW_POINTS = 8
+
+# Concatenate the rows of a (wells, points) array into one line, with a NaN gap after every well, so
+# all wells are drawn by a single WebGL trace
+def gapped(values):
+    values = np.asarray(values, dtype=float)
+    return np.hstack([values, np.full((len(values), 1), np.nan)]).ravel()
+
+# One interactive WebGL chart of the fitted IPR of every well of a coefficients table (decimated to
+# `points` points per well) and, given the WellIndex of the test data, of all the test points.
+# Curves and test points are one trace each whatever the number of wells; hovering shows the well.
+# Wells in `highlight` (names) are drawn again on top with their own colour and legend entry.
+def figure_overview(coefficients_df, reservoir_type, index=None, points=OVERVIEW_POINTS, highlight=()):
+    rate_unit = 'km3/d' if reservoir_type == 'Gas' else 'm3/d'
+    wells = coefficients_df['Well'].to_numpy()
+    curves = CurveStore.from_coefficients(coefficients_df, reservoir_type, points=points)
+    Q, Pwf = curves.block
+    names = np.repeat(wells, points + 1)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=gapped(Q), y=gapped(Pwf), mode='lines', name='Fitted IPR', customdata=names,
+                               line=dict(width=1, color='rgba(31, 119, 180, 0.35)'),
+                               hovertemplate='Well %{customdata}<br>Q %{x:.2f}<br>Pwf %{y:.2f}<extra></extra>'))
+
+    if index is not None:
+        fig.add_trace(go.Scattergl(x=index.Q, y=index.Pwf, mode='markers', name='Test data',
+                                   customdata=np.repeat(index.wells, np.diff(index.offsets)),
+                                   marker=dict(size=4, color='rgba(214, 39, 40, 0.6)'),
+                                   hovertemplate='Well %{customdata}<br>Q %{x:.2f}<br>Pwf %{y:.2f}<extra></extra>'))
+
+    positions = {well: i for i, well in enumerate(wells)}
+    for well in highlight:
+        i = positions[well]
+        fig.add_trace(go.Scattergl(x=Q[i], y=Pwf[i], mode='lines', name=f'Well {well}', line=dict(width=3)))
+        if index is not None:
+            Pwf_test, Q_test = index.test_data(index.position(well))
+            fig.add_trace(go.Scattergl(x=Q_test, y=Pwf_test, mode='markers', name=f'Tests {well}',
+                                       marker=dict(size=8)))
+
+    fig.update_layout(xaxis_title=f'Rate ({rate_unit})', yaxis_title='Pressure (bar)',
+                      title='Test Data and IPR Curves of All Wells', hovermode='closest')
+    fig.update_xaxes(rangemode='tozero')
+    fig.update_yaxes(rangemode='tozero')
+    return fig
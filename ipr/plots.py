@@ -0,0 +1,76 @@
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from ipr.models import curve_IPR, curve_IPR_Vogel
+
+# Figure of the test data and fitted Forchheimer IPR of one well (a and b in solver units).
+# curve optionally gives the sampled (Q, Pwf) of the fitted IPR, e.g. from a CurveStore.
+def figure_IPR_curve(well_name, Q, Pwf, Pws, a, b, AOF, curve=None):
+    if curve is None:
+        Q_range = np.linspace(0, AOF, 500)
+        Pwf_fit = curve_IPR(Q_range, [a, b, Pws])
+    else:
+        Q_range, Pwf_fit = curve
+
+    fig, ax = plt.subplots()
+    ax.plot(Q_range, Pwf_fit, color='blue', label=f'IPR Curve - Well {well_name}')
+    ax.scatter(Q, Pwf, color='magenta', label=f'Test Data - Well {well_name}')
+
+    ax.set_xlabel('Rate (km$^3$/d)')
+    ax.set_ylabel('Pressure (bar)')
+    ax.set_title(f'Test Data and IPR Curves for Well {well_name}')
+    ax.legend()
+    ax.grid(True)
+    ax.set_xlim(0, None)
+    ax.set_ylim(0, None)
+
+    return fig
+
+# Figure of the test data and fitted Vogel IPR of one well (curve as in figure_IPR_curve)
+def figure_Vogel_curve(well_name, Q, Pwf, Pws, Qmax, curve=None):
+    if curve is None:
+        Pwf_range = np.linspace(0, Pws, 500)
+        Qmax_curve_fit = curve_IPR_Vogel(Pwf_range, Pws, Qmax)
+    else:
+        Qmax_curve_fit, Pwf_range = curve
+
+    fig, ax = plt.subplots()
+    ax.plot(Qmax_curve_fit, Pwf_range, color='black', label='IPR (Fitted Curve)')
+    ax.scatter(Q, Pwf, color='magenta', label='Test Data')
+
+    ax.set_xlabel('Rate (m$^3$/d)')
+    ax.set_ylabel('Pressure (bar)')
+    ax.set_title(f'Pressure vs Rate for Well {well_name}')
+    ax.legend()
+    ax.grid(True)
+    ax.set_xlim(0, ax.get_xlim()[1])
+    ax.set_ylim(0, ax.get_ylim()[1])
+
+    return fig
+
+# Figure of the field IPR (total rate of all wells at a common bottomhole pressure), with the operating
+# point of a target rate if one was solved
+def figure_field_IPR(Pwf, total_rate, rate_unit, target_rate=None, target_Pwf=None):
+    fig, ax = plt.subplots()
+    ax.plot(total_rate, Pwf, color='blue', label='Field IPR')
+    if target_Pwf is not None and np.isfinite(target_Pwf):
+        ax.scatter([target_rate], [target_Pwf], color='red', zorder=3, label='Target rate')
+
+    ax.set_xlabel(f'Total rate ({rate_unit})')
+    ax.set_ylabel('Common bottomhole pressure (bar)')
+    ax.set_title('Field IPR')
+    ax.legend()
+    ax.grid(True)
+    ax.set_xlim(0, None)
+    ax.set_ylim(0, None)
+
+    return fig
+
+# PNG bytes of a figure. The figure is closed, so it doesn't stay in pyplot's list of open figures.
+def figure_png(fig, dpi=100):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
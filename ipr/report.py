@@ -0,0 +1,107 @@
+import io
+import os
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from ipr.fitting import MIN_PARALLEL_WELLS, coefficients_params
+
+# Wells rendered per task sent to a worker
+REPORT_CHUNK_SIZE = 25
+
+# File name of a well's plot inside the report: the position of the well (zero padded to the digits of
+# n_wells) keeps names unique when sanitising makes two well names equal, e.g. 'A/1' and 'A_1'
+def plot_name(position, well_name, image_format, n_wells):
+    digits = len(str(max(n_wells - 1, 0)))
+    return f"plots/{position:0{digits}d}_" + re.sub(r'[^\w.-]', '_', str(well_name)) + "." + image_format
+
+# Render the IPR plots of one chunk of wells with the non-interactive Agg backend and return the
+# (file name, bytes) of each. A chunk is plain arrays: the wells and their plot file names, their reservoir
+# pressure and fitted parameters (solver units), AOF (gas) and the test data sorted by well with row
+# offsets, as in WellIndex.
+def render_chunk(reservoir_type, wells, names, Pws, params, AOF, offsets, Q, Pwf, image_format='png', dpi=100):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from ipr.plots import figure_IPR_curve, figure_Vogel_curve
+
+    files = []
+    for i, well_name in enumerate(wells):
+        rows = slice(offsets[i], offsets[i + 1])
+        if reservoir_type == 'Gas':
+            fig = figure_IPR_curve(well_name, Q[rows], Pwf[rows], Pws[i], params[i, 0], params[i, 1], AOF[i])
+        else:
+            fig = figure_Vogel_curve(well_name, Q[rows], Pwf[rows], Pws[i], params[i, 0])
+        buffer = io.BytesIO()
+        # No bbox_inches='tight': it draws every figure twice
+        fig.savefig(buffer, format=image_format, dpi=dpi)
+        plt.close(fig)
+        files.append((names[i], buffer.getvalue()))
+    return files
+
+# Zip report of a fitted field: the coefficients table as CSV and the IPR plot (PNG or PDF) of every
+# well. index is the WellIndex the coefficients were computed from (row i of the table is well i).
+# Plots are rendered in chunks on a pool of processes (or serially, pyplot isn't thread-safe) and written to the zip
+# in well order as they complete; at most two chunks per worker are in flight, so memory stays bounded
+# whatever the size of the field. progress(done, total) is called after every chunk.
+# target is a path or a binary file object.
+def build_report(target, coefficients_df, reservoir_type, index, image_format='png', backend='processes',
+                 max_workers=None, chunk_size=REPORT_CHUNK_SIZE, progress=None):
+    n_wells = len(index)
+    max_workers = max_workers or os.cpu_count() or 1
+    if n_wells < MIN_PARALLEL_WELLS or max_workers == 1:
+        backend = 'serial'
+
+    params = coefficients_params(reservoir_type, coefficients_df)
+    AOF = coefficients_df['AOF (km3/d)'].to_numpy(dtype=float) if reservoir_type == 'Gas' else None
+
+    def chunk(start):
+        stop = min(start + chunk_size, n_wells)
+        rows = slice(index.offsets[start], index.offsets[stop])
+        names = [plot_name(position, index.wells[position], image_format, n_wells) for position in range(start, stop)]
+        return (reservoir_type, index.wells[start:stop], names, index.Pws[start:stop], params[start:stop],
+                None if AOF is None else AOF[start:stop], index.offsets[start:stop + 1] - index.offsets[start],
+                index.Q[rows], index.Pwf[rows], image_format)
+
+    starts = range(0, n_wells, chunk_size)
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as report:
+        report.writestr('coefficients.csv', coefficients_df.to_csv(index=False))
+
+        if backend == 'serial':
+            for done, start in enumerate(starts, 1):
+                write_files(report, render_chunk(*chunk(start)))
+                if progress is not None:
+                    progress(done, len(starts))
+            return target
+
+        if backend != 'processes':
+            raise ValueError(f"Unknown backend '{backend}', expected 'serial' or 'processes'")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            next_chunk = iter(starts)
+            done = 0
+            for start in next_chunk:
+                pending.append(executor.submit(render_chunk, *chunk(start)))
+                if len(pending) >= 2 * max_workers:
+                    break
+            while pending:
+                write_files(report, pending.popleft().result())
+                done += 1
+                if progress is not None:
+                    progress(done, len(starts))
+                start = next(next_chunk, None)
+                if start is not None:
+                    pending.append(executor.submit(render_chunk, *chunk(start)))
+    return target
+
+def write_files(report, files):
+    for name, content in files:
+        # Images are already compressed
+        report.writestr(name, content, compress_type=zipfile.ZIP_STORED)
+
+# Zip report in memory, e.g. for a download button
+def report_bytes(coefficients_df, reservoir_type, index, **report_settings):
+    buffer = io.BytesIO()
+    build_report(buffer, coefficients_df, reservoir_type, index, **report_settings)
+    return buffer.getvalue()
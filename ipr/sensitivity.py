@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from ipr.fitting import coefficients_params
+from ipr.models import curve_IPR, curve_IPR_Vogel
+
+# Future AOF (Qmax for oil) by the Fetkovich method: AOF_new = AOF * (Pws_new / Pws) ** (2n) for gas and
+# ** (2n + 1) for oil. All arguments broadcast against each other.
+def fetkovich_AOF(reservoir_type, AOF, Pws, Pws_new, n):
+    exponent = 2 * n if reservoir_type == 'Gas' else 2 * n + 1
+    return AOF * (Pws_new / Pws) ** exponent
+
+# Future reservoir pressures of every well as fractions of its current pressure, shape (wells, fractions)
+def pressure_grid(Pws, fractions):
+    return np.asarray(Pws, dtype=float)[:, None] * np.asarray(fractions, dtype=float)
+
+# Fetkovich sensitivity of every well of a coefficients table over a grid of future reservoir pressures
+# and exponents n, evaluated in one broadcasted pass.
+# Pws_new is either one grid shared by all wells, shape (pressures,), or one grid per well, shape
+# (wells, pressures) (see pressure_grid). AOF[i, j, k] is the future AOF (Qmax for oil) of well i at
+# pressure j of its grid and exponent n[k], stored as float32 (10k wells x 50 pressures x 10 exponents
+# is 20 MB).
+class SensitivityCube:
+    def __init__(self, reservoir_type, wells, Pws, params, Pws_new, n, AOF):
+        self.reservoir_type = reservoir_type
+        self.wells = wells
+        self.Pws = Pws
+        self.params = params
+        self.Pws_new = Pws_new
+        self.n = n
+        self.AOF = AOF
+
+    @classmethod
+    def from_coefficients(cls, coefficients_df, reservoir_type, Pws_new, n):
+        Pws = coefficients_df['Pres (bar)'].to_numpy(dtype=float)
+        params = coefficients_params(reservoir_type, coefficients_df)
+        if reservoir_type == 'Gas':
+            AOF = coefficients_df['AOF (km3/d)'].to_numpy(dtype=float)
+        else:
+            AOF = params[:, 0]
+
+        Pws_new = np.broadcast_to(np.asarray(Pws_new, dtype=float), (len(Pws), np.shape(Pws_new)[-1]))
+        n = np.asarray(n, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            AOF_new = fetkovich_AOF(reservoir_type, AOF[:, None, None], Pws[:, None, None], Pws_new[:, :, None],
+                                    n[None, None, :])
+        return cls(reservoir_type, coefficients_df['Well'].to_numpy(), Pws, params, Pws_new, n,
+                   AOF_new.astype(np.float32))
+
+    @property
+    def shape(self):
+        return self.AOF.shape
+
+    # Future IPR curves sampled at `points` points, shape (wells, pressures, exponents, points), as
+    # (Q, Pwf). Gas curves keep the fitted a and b with the new reservoir pressure over 0..AOF_new, oil
+    # curves are Vogel curves with the new Pws and Qmax, as on the single-well pages.
+    # wells optionally restricts the curves to some wells (positions), since the full array grows with
+    # the number of points (10k x 50 x 10 x 50 points is 1 GB per array).
+    def curves(self, points=50, wells=slice(None)):
+        fraction = np.linspace(0, 1, points, dtype=np.float32)
+        Pws_new = self.Pws_new[wells][:, :, None, None].astype(np.float32)
+        AOF = self.AOF[wells][..., None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.reservoir_type == 'Gas':
+                a = self.params[wells, 0][:, None, None, None].astype(np.float32)
+                b = self.params[wells, 1][:, None, None, None].astype(np.float32)
+                Q = AOF * fraction
+                return Q, curve_IPR(Q, [a, b, Pws_new])
+            Pwf = Pws_new * fraction
+            return curve_IPR_Vogel(Pwf, Pws_new, AOF), np.broadcast_to(Pwf, AOF.shape[:-1] + (points,))
+
+    # Total AOF of the field for every pressure fraction and exponent, shape (pressures, exponents)
+    def field_AOF(self):
+        return np.nansum(self.AOF, axis=0, dtype=np.float64)
+
+    # Long table with one row per well, pressure and exponent
+    def to_frame(self):
+        n_wells, n_pressures, n_exponents = self.shape
+        column = 'AOF (km3/d)' if self.reservoir_type == 'Gas' else 'Qmax (m3/d)'
+        return pd.DataFrame({
+            'Well': np.repeat(self.wells, n_pressures * n_exponents),
+            'Pres (bar)': np.repeat(self.Pws_new.ravel(), n_exponents),
+            'n': np.tile(self.n, n_wells * n_pressures),
+            column: self.AOF.ravel()
+        })
+
+    # Compact export: compressed .npz with the float32 cube and the grids (path may be a file object)
+    def save(self, path):
+        np.savez_compressed(path, reservoir_type=self.reservoir_type, wells=np.array(self.wells, dtype=str),
+                            Pws=self.Pws, params=self.params, Pws_new=self.Pws_new, n=self.n, AOF=self.AOF)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as state:
+            return cls(str(state['reservoir_type']), state['wells'].astype(object), state['Pws'], state['params'],
+                       state['Pws_new'], state['n'], state['AOF'])
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from ipr.fitting import calculate_coefficients, coefficients_params, diagnostics_frame
+from ipr.incremental import WellStatistics
+from ipr.tables import read_table_chunks
+from ipr.validation import check_columns, valid_rows
+from ipr.wells import rate_column
+
+# Compact dtypes used when reading multiwell test files in chunks
+COMPACT_DTYPES = {"Well": "category", "Pres (bar)": "float32", "BHP (bar)": "float32"}
+
+# Read a multiwell CSV, Parquet or Feather file (see ipr.tables) in chunks of rows, with compact dtypes
+# and only the needed columns
+def read_test_chunks(source, reservoir_type, chunksize=1_000_000, file_format=None):
+    columns = ["Well", "Pres (bar)", "BHP (bar)", rate_column(reservoir_type)]
+    dtypes = dict(COMPACT_DTYPES, **{rate_column(reservoir_type): "float32"})
+    return read_table_chunks(source, columns, chunksize, dtypes=dtypes, file_format=file_format)
+
+# Fit a multiwell file (CSV, Parquet or Feather) read in chunks, yielding coefficient tables as wells complete.
+# mode='sorted' expects the rows of each well to be contiguous (as in exports sorted by well): the rows
+# of the last well of a chunk are carried over to the next one, every other well is complete and is
+# fitted with calculate_coefficients (any solver, cache or backend settings apply). A well whose rows show
+# up again after it was fitted raises ValueError instead of being fitted twice.
+# mode='statistics' accepts rows in any order and keeps running per-well sums only (see WellStatistics),
+# yielding a single table at the end of the file. The sums only give the closed-form fit, so a per-well
+# solver or bootstrap raise ValueError; instrument=True adds the diagnostics of statistics_diagnostics.
+# Either way peak memory is bounded by the chunk size, not the file size.
+# validate=True raises ValueError if the file lacks a required column (see ipr.validation.check_columns)
+# and drops the rows failing the checks of ipr.validation.row_checks from every chunk before fitting;
+# the per-well report of validate_tests needs the whole file and is not built.
+def stream_coefficients(source, reservoir_type, chunksize=1_000_000, mode='sorted', validate=False,
+                        **fit_settings):
+    chunks = read_test_chunks(source, reservoir_type, chunksize=chunksize)
+    if validate:
+        chunks = validated_chunks(chunks, reservoir_type)
+
+    if mode == 'statistics':
+        if fit_settings.get('solver', 'batch') != 'batch' or fit_settings.get('bootstrap'):
+            raise ValueError("The statistics ingestion fits every well from running sums: it only supports the "
+                             "batch solver, without bootstrap")
+        start = time.perf_counter()
+        statistics = WellStatistics(reservoir_type)
+        for chunk in chunks:
+            statistics.update(chunk)
+        coefficients_df = statistics.coefficients()
+        if fit_settings.get('instrument'):
+            diagnostics = statistics_diagnostics(reservoir_type, coefficients_df, time.perf_counter() - start)
+            coefficients_df = pd.concat([coefficients_df, diagnostics], axis=1)
+        yield coefficients_df
+        return
+
+    if mode != 'sorted':
+        raise ValueError(f"Unknown mode '{mode}', expected 'sorted' or 'statistics'")
+
+    pending = None
+    fitted = set()
+    for chunk in chunks:
+        chunk["Well"] = chunk["Well"].astype(str)
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        if not len(chunk):
+            continue
+
+        last_well = chunk["Well"].to_numpy()[-1]
+        complete = chunk["Well"].to_numpy() != last_well
+        pending = chunk[~complete]
+        if complete.any():
+            check_not_fitted(chunk["Well"].to_numpy()[complete], fitted)
+            yield calculate_coefficients(chunk[complete], reservoir_type, **fit_settings)
+
+    if pending is not None and len(pending):
+        check_not_fitted(pending["Well"].to_numpy(), fitted)
+        yield calculate_coefficients(pending, reservoir_type, **fit_settings)
+
+# Solver diagnostics of a statistics-mode fit, as in batch_diagnostics: the time is spread evenly over
+# the wells and there are no iterations. The tests aren't kept, so the final loss is NaN.
+def statistics_diagnostics(reservoir_type, coefficients_df, elapsed):
+    n_wells = len(coefficients_df)
+    converged = np.isfinite(coefficients_params(reservoir_type, coefficients_df)).all(axis=1)
+    stats = np.column_stack([np.full(n_wells, elapsed / max(n_wells, 1)), np.zeros(n_wells), np.zeros(n_wells),
+                             np.full(n_wells, np.nan), converged])
+    return diagnostics_frame(stats, ['running sums'] * n_wells)
+
+def validated_chunks(chunks, reservoir_type):
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            check_columns(chunk, reservoir_type)
+        yield chunk[valid_rows(chunk, reservoir_type)]
+
+# Record the wells about to be fitted in mode='sorted', raising ValueError if one was already fitted
+def check_not_fitted(wells, fitted):
+    wells = set(pd.unique(wells))
+    repeated = wells & fitted
+    if repeated:
+        raise ValueError(f"Rows of well {sorted(repeated)[0]} are not contiguous: the sorted ingestion needs the "
+                         f"rows of each well together, use the statistics ingestion for files in any order")
+    fitted |= wells
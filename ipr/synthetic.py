@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from ipr.models import calculate_AOF, curve_IPR_Vogel
+
+# Well names and the well code of every test for n_wells wells with a random number of tests each
+def synthetic_wells(rng, n_wells, tests):
+    counts = rng.integers(tests[0], tests[1] + 1, n_wells)
+    codes = np.repeat(np.arange(n_wells), counts)
+    width = len(str(max(n_wells - 1, 0)))
+    wells = np.array([f"W{i:0{width}d}" for i in range(n_wells)], dtype=object)
+    return wells, codes
+
+# Synthetic gas field with known Forchheimer coefficients.
+# Returns the multiwell test table (same columns as the uploaded CSV) and the true coefficients
+# (a and b in bar2/(km3/d)2 and bar2/(km3/d), as used by the solvers). noise is the relative
+# standard deviation applied to every BHP.
+def synthetic_gas_field(n_wells, tests=(2, 6), noise=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    wells, codes = synthetic_wells(rng, n_wells, tests)
+
+    a = rng.uniform(5e-3, 5e-2, n_wells)
+    b = rng.uniform(0.1, 1.0, n_wells)
+    Pws = rng.uniform(100, 350, n_wells)
+    AOF = calculate_AOF(a, b, Pws)
+
+    Q = AOF[codes] * rng.uniform(0.1, 0.9, len(codes))
+    Pwf = np.sqrt(Pws[codes] ** 2 - a[codes] * Q ** 2 - b[codes] * Q) * (1 + noise * rng.standard_normal(len(codes)))
+
+    data = pd.DataFrame({'Well': wells[codes], 'Pres (bar)': Pws[codes], 'BHP (bar)': Pwf, 'Rate (km3/d)': Q})
+    truth = pd.DataFrame({'Well': wells, 'Pres (bar)': Pws, 'a': a, 'b': b, 'AOF (km3/d)': AOF})
+    return data, truth
+
+# Synthetic oil field with known Vogel Qmax. noise is the relative standard deviation applied to
+# every rate.
+def synthetic_oil_field(n_wells, tests=(2, 6), noise=0.01, seed=0):
+    rng = np.random.default_rng(seed)
+    wells, codes = synthetic_wells(rng, n_wells, tests)
+
+    Qmax = rng.uniform(50, 1000, n_wells)
+    Pws = rng.uniform(100, 350, n_wells)
+
+    Pwf = Pws[codes] * rng.uniform(0.1, 0.9, len(codes))
+    Q = curve_IPR_Vogel(Pwf, Pws[codes], Qmax[codes]) * (1 + noise * rng.standard_normal(len(codes)))
+
+    data = pd.DataFrame({'Well': wells[codes], 'Pres (bar)': Pws[codes], 'BHP (bar)': Pwf, 'Rate (m3/d)': Q})
+    truth = pd.DataFrame({'Well': wells, 'Pres (bar)': Pws, 'Qmax (m3/d)': Qmax})
+    return data, truth
+
+def synthetic_field(reservoir_type, n_wells, tests=(2, 6), noise=0.01, seed=0):
+    if reservoir_type == 'Gas':
+        return synthetic_gas_field(n_wells, tests=tests, noise=noise, seed=seed)
+    return synthetic_oil_field(n_wells, tests=tests, noise=noise, seed=seed)
@@ -0,0 +1,90 @@
+import io
+import os
+
+import pandas as pd
+
+# Table file formats by extension; Feather (v2) files are Arrow IPC files
+TABLE_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+MIME_TYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet',
+              'feather': 'application/vnd.apache.arrow.file'}
+
+# Columns of a multiwell test table, for either reservoir type; Date is optional (history fitting)
+TEST_COLUMNS = ["Well", "Date", "Pres (bar)", "BHP (bar)", "Rate (km3/d)", "Rate (m3/d)"]
+
+# Format of a path or an uploaded file (from its name), CSV if the extension is unknown
+def table_format(source):
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '')
+    return TABLE_FORMATS.get(os.path.splitext(str(name))[1].lower(), 'csv')
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+# Read a CSV, Parquet or Feather table from a path or a file object. columns keeps only those columns
+# (the ones missing from the file are ignored): Parquet and Feather files never read the others, and
+# local Parquet and Feather files are memory mapped. Parquet and Feather keep the dtypes they were
+# written with (float32, category...).
+def read_table(source, columns=None, file_format=None):
+    file_format = file_format or table_format(source)
+    if file_format == 'csv':
+        return pd.read_csv(source, usecols=None if columns is None else lambda column: column in columns)
+    return arrow_table(source, columns, file_format).to_pandas()
+
+# Arrow table of a Parquet or Feather file, restricted to the columns it has among columns
+def arrow_table(source, columns, file_format):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if file_format == 'parquet':
+        parquet_file = pq.ParquetFile(source, memory_map=is_path(source))
+        return parquet_file.read(columns=present_columns(parquet_file.schema_arrow, columns))
+
+    if is_path(source):
+        source = pa.memory_map(str(source))
+    table = pa.ipc.open_file(source).read_all()
+    return table.select(present_columns(table.schema, columns))
+
+def present_columns(schema, columns):
+    return schema.names if columns is None else [column for column in columns if column in schema.names]
+
+# Read a table in chunks of about chunksize rows (DataFrames), so peak memory depends on the chunk size.
+# As in read_table, the columns missing from the file are ignored. CSV is parsed chunk by chunk with
+# dtypes, Parquet is read batch by batch and Feather is memory mapped (local files) and sliced without
+# copies before the conversion of each chunk.
+def read_table_chunks(source, columns, chunksize, dtypes=None, file_format=None):
+    file_format = file_format or table_format(source)
+    if file_format == 'csv':
+        yield from pd.read_csv(source, usecols=lambda column: column in columns, dtype=dtypes, chunksize=chunksize)
+        return
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(source, memory_map=is_path(source))
+        batches = parquet_file.iter_batches(batch_size=chunksize,
+                                            columns=present_columns(parquet_file.schema_arrow, columns))
+    else:
+        batches = arrow_table(source, columns, file_format).to_batches(max_chunksize=chunksize)
+    for batch in batches:
+        chunk = batch.to_pandas()
+        yield chunk if dtypes is None else chunk.astype({column: dtypes[column] for column in chunk.columns
+                                                         if column in dtypes})
+
+# Write a table as CSV, Parquet or Feather, to a path or a binary file object (CSV: text or binary)
+def write_table(table, target, file_format=None):
+    file_format = file_format or table_format(target)
+    if file_format == 'csv':
+        table.to_csv(target, index=False)
+    elif file_format == 'parquet':
+        table.to_parquet(target, index=False)
+    elif file_format == 'feather':
+        table.reset_index(drop=True).to_feather(target)
+    else:
+        raise ValueError(f"Unknown format '{file_format}', expected 'csv', 'parquet' or 'feather'")
+
+# Table file content, e.g. for a download button
+def table_bytes(table, file_format):
+    if file_format == 'csv':
+        return table.to_csv(index=False).encode()
+    buffer = io.BytesIO()
+    write_table(table, buffer, file_format)
+    return buffer.getvalue()
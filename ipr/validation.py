@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from ipr.wells import group_wells, rate_column
+
+# Checks of every test row, reported per well; a row failing any of them is not fitted
+ROW_CHECKS = {
+    'missing': "missing value",
+    'pressure': "Pres <= 0",
+    'bhp': "BHP <= 0",
+    'drawdown': "BHP >= Pres",
+    'rate': "negative rate",
+}
+
+# Columns of the validation report, one row per well with an issue
+REPORT_COLUMNS = ['Well', 'Tests', 'Valid tests', 'Status', 'Issues']
+
+# Columns a multiwell test table needs for a reservoir type
+def required_columns(reservoir_type):
+    return ["Well", "Pres (bar)", "BHP (bar)", rate_column(reservoir_type)]
+
+# Raises ValueError naming the required columns missing from data
+def check_columns(data, reservoir_type):
+    missing = [column for column in required_columns(reservoir_type) if column not in data.columns]
+    if missing:
+        raise ValueError(f"Missing columns for a {reservoir_type.lower()} reservoir: {', '.join(missing)}")
+
+# Pres, BHP and rate of every row as floats, non-numeric values as NaN
+def test_arrays(data, reservoir_type):
+    return tuple(pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)
+                 for column in ("Pres (bar)", "BHP (bar)", rate_column(reservoir_type)))
+
+# Boolean array per ROW_CHECKS entry, True where the row fails the check. Shut-in points (rate = 0) are
+# valid: they are counted in the coefficients table and left out of the fit, and a shut-in test at
+# BHP = Pres is the usual anchor point of the curve.
+def row_checks(data, reservoir_type):
+    Pres, Pwf, Q = test_arrays(data, reservoir_type)
+    missing = data["Well"].isna().to_numpy() | np.isnan(Pres) | np.isnan(Pwf) | np.isnan(Q)
+    with np.errstate(invalid='ignore'):
+        return {
+            'missing': missing,
+            'pressure': ~missing & (Pres <= 0),
+            'bhp': ~missing & (Pwf <= 0),
+            'drawdown': ~missing & ((Pwf > Pres) | ((Pwf == Pres) & (Q != 0))),
+            'rate': ~missing & (Q < 0),
+        }
+
+# Rows that pass every row check
+def valid_rows(data, reservoir_type):
+    return ~np.logical_or.reduce(list(row_checks(data, reservoir_type).values()))
+
+# Validate a multiwell test table in one vectorized pass over all rows and wells, before any solver runs.
+# Returns the rows to fit and a report (REPORT_COLUMNS) of the wells with an issue:
+# - 'skipped': no valid flowing test, the well is dropped from the rows to fit;
+# - 'warning': some tests are rejected (the well is fitted on the others), Pres differs between the
+#   well's tests (the first one is used, as in calculate_coefficients), or a gas well has a single
+#   flowing test (a and b are not unique).
+# Raises ValueError if a required column is missing.
+def validate_tests(data, reservoir_type):
+    check_columns(data, reservoir_type)
+    checks = row_checks(data, reservoir_type)
+    valid = ~np.logical_or.reduce(list(checks.values()))
+
+    # Rows without a well name have no code, they only show up as rejected rows
+    wells, codes = group_wells(data)
+    n_wells = len(wells)
+    named = codes >= 0
+    Pres, _, Q = test_arrays(data, reservoir_type)
+
+    def per_well(mask):
+        return np.bincount(codes[mask & named], minlength=n_wells)
+
+    failures = {name: per_well(failed) for name, failed in checks.items()}
+    tests = per_well(np.ones(len(data), dtype=bool))
+    valid_tests = per_well(valid)
+    with np.errstate(invalid='ignore'):
+        flowing_tests = per_well(valid & (Q > 0))
+
+    # Spread of Pres within each well, over the rows sorted by well
+    order = np.argsort(codes, kind='stable')[np.count_nonzero(~named):]
+    starts = np.searchsorted(codes[order], np.arange(n_wells))
+    mixed_pressure = np.zeros(n_wells, dtype=bool)
+    if n_wells:
+        sorted_Pres = Pres[order]
+        mixed_pressure = np.fmax.reduceat(sorted_Pres, starts) - np.fmin.reduceat(sorted_Pres, starts) > 1e-9
+
+    # Issue flags of every well (with the number of rows for row checks); texts are only built for the
+    # wells that have an issue
+    skipped = flowing_tests == 0
+    flags = {description: (failures[name] > 0, failures[name]) for name, description in ROW_CHECKS.items()}
+    flags["mixed Pres, first one used"] = (mixed_pressure, None)
+    if reservoir_type == 'Gas':
+        flags["single flowing test, a and b not unique"] = (flowing_tests == 1, None)
+    flags["no valid flowing test"] = (skipped, None)
+    flagged = np.flatnonzero(np.logical_or.reduce([flag for flag, _ in flags.values()]))
+
+    issues = np.full(len(flagged), '', dtype=object)
+    for description, (flag, counts) in flags.items():
+        text = description
+        if counts is not None:
+            text = description + " (" + counts[flagged].astype(str).astype(object) + ")"
+        issues = add_issue(issues, flag[flagged], text)
+
+    report = pd.DataFrame({
+        'Well': wells[flagged],
+        'Tests': tests[flagged],
+        'Valid tests': valid_tests[flagged],
+        'Status': np.where(skipped[flagged], 'skipped', 'warning'),
+        'Issues': issues,
+    })
+
+    keep = valid & named & ~skipped[np.where(named, codes, 0)]
+    columns = required_columns(reservoir_type)[1:]
+    return data[keep].astype(dict.fromkeys(columns, float)), report
+
+# Append an issue to the issues text of the flagged wells
+def add_issue(issues, flagged, text):
+    separated = np.where(issues != '', issues + '; ', issues)
+    return np.where(flagged, separated + text, issues)
+
+# One line summary of validate_tests: data is the validated table, valid_data the rows kept for fitting
+def validation_summary(report, data, valid_data):
+    skipped = int((report['Status'] == 'skipped').sum())
+    warnings = int((report['Status'] == 'warning').sum())
+    return (f"{data['Well'].nunique()} wells: {skipped} skipped, {warnings} with warnings, "
+            f"{len(data) - len(valid_data)} of {len(data)} test rows not fitted")
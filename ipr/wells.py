@@ -0,0 +1,84 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+# Rate column of the multiwell test data for each reservoir type
+def rate_column(reservoir_type):
+    return "Rate (km3/d)" if reservoir_type == 'Gas' else "Rate (m3/d)"
+
+# Well names (sorted, as in data.groupby("Well")) and the well code of every row; rows without a well
+# name get code -1
+def group_wells(data):
+    codes, wells = pd.factorize(data["Well"], sort=True)
+    return wells, codes
+
+# Reservoir pressure of each well, taken from its first row (rows with code -1 are ignored)
+def first_per_well(values, codes, n_wells):
+    named = codes >= 0
+    first = np.full(n_wells, np.nan)
+    first[codes[named][::-1]] = np.asarray(values, dtype=float)[named][::-1]
+    return first
+
+# Multiwell test data grouped by well, built once and shared by fitting, plotting and lookups.
+# Rows are sorted by well (keeping each well's own row order) and the rows of well i are
+# offsets[i]:offsets[i + 1] of the Pwf and Q arrays. Well i is also row i of the coefficients table
+# returned by calculate_coefficients, so per-well lookups are O(1) slices (views, no copies)
+# instead of a groupby or a boolean scan over the whole field.
+class WellIndex:
+    def __init__(self, wells, offsets, Pws, Pwf, Q):
+        self.wells = wells
+        self.offsets = offsets
+        self.Pws = Pws
+        self.Pwf = Pwf
+        self.Q = Q
+
+    @classmethod
+    def from_data(cls, data, reservoir_type):
+        wells, codes = group_wells(data)
+        n_wells = len(wells)
+        # Rows without a well name sort first (code -1) and are left out, as in data.groupby("Well")
+        order = np.argsort(codes, kind='stable')[np.count_nonzero(codes < 0):]
+        offsets = np.searchsorted(codes[order], np.arange(n_wells + 1))
+        Pws = first_per_well(data["Pres (bar)"], codes, n_wells)
+
+        Pwf = data["BHP (bar)"].to_numpy(dtype=float)[order]
+        Q = data[rate_column(reservoir_type)].to_numpy(dtype=float)[order]
+        return cls(wells, offsets, Pws, Pwf, Q)
+
+    # Index of the tests of a single well, e.g. the test data entered on the single-well pages
+    @classmethod
+    def single_well(cls, well, Pws, Pwf, Q):
+        Q = np.asarray(Q, dtype=float)
+        return cls(np.array([well], dtype=object), np.array([0, len(Q)]), np.array([Pws], dtype=float),
+                   np.asarray(Pwf, dtype=float), Q)
+
+    def __len__(self):
+        return len(self.wells)
+
+    # Well name -> position, built on first use
+    @cached_property
+    def positions(self):
+        return {well: i for i, well in enumerate(self.wells)}
+
+    def position(self, well):
+        return self.positions[well]
+
+    def rows(self, i):
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    # BHP and rate of the tests of well i
+    def test_data(self, i):
+        rows = self.rows(i)
+        return self.Pwf[rows], self.Q[rows]
+
+    # Well position of every row
+    def codes(self):
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    # Index restricted to some wells, given by their (ascending) positions
+    def subset(self, positions):
+        lengths = np.diff(self.offsets)[positions]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        rows = np.repeat(self.offsets[positions] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return WellIndex(self.wells[positions], offsets, self.Pws[positions], self.Pwf[rows], self.Q[rows])
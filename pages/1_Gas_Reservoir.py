@@ -1,10 +1,17 @@
+import io
+
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import minimize
 from tabulate import tabulate
 import pandas as pd
 
+from ipr.cache import fit_cache
+from ipr.fitting import coefficients_frame, fit_params_cached
+from ipr.models import calculate_AOF, curve_IPR
+from ipr.sensitivity import fetkovich_AOF
+from ipr.wells import WellIndex
+
 st.page_link("Homepage.py", label="Go back to Homepage")
 st.title("Gas Reservoir")
 
@@ -27,11 +34,6 @@ st.latex(r'''Pwf=\sqrt{Pws ^2-a \cdot Q^2 -b \cdot Q }''')
 
 st.divider()
 
-# Definition of the quadratic curve equation (Inflow Performance Relationship - IPR)
-def curve_IPR(Q, params):
-    a, b, Pws = params
-    return np.sqrt(-a * Q ** 2 - b * Q + Pws ** 2)
-
 # Function to collect input data
 def collect_data():
     st.header("Input Test Data")
@@ -52,6 +54,56 @@ def collect_data():
 
     return pd.DataFrame(data, columns=["Date", "Comment", "Pws (bar)", "Pwf (bar)", "Rate (km3/d)"])
 
+# Fit the IPR to the test data with the per-well solvers of ipr.fitting (minimize or least_squares) and
+# the shared fit cache. warm_start is None, 'linear' or the (a, b) coefficients of a previous fit in solver
+# units (see initial_params): returns a, b, Pws, AOF, the fitted curve and the solver iterations (None when
+# the fit was found in the fit cache).
+# Memoized on the test data, so changing the sensitivity inputs doesn't refit the curve
+@st.cache_data(max_entries=32)
+def fit_IPR(Pws, Pwf_data, Q_data, solver='minimize', warm_start=None):
+    index = WellIndex.single_well('Well', Pws, Pwf_data, Q_data)
+    if isinstance(warm_start, tuple):
+        warm_start = coefficients_frame('Gas', index.wells, index.Pws, np.array([warm_start]))
+    params, diagnostics = fit_params_cached(fit_cache, 'Gas', index, solver=solver, warm_start=warm_start)
+    iterations = None
+    if diagnostics['Solver message'].iloc[0] != 'cached':
+        iterations = int(diagnostics['Iterations'].iloc[0])
+
+    # Extract optimized parameters
+    a_fit, b_fit = params[0]
+
+    # AOF Calculation
+    AOF = float(calculate_AOF(a_fit, b_fit, Pws))
+    if not np.isfinite(AOF):
+        return a_fit, b_fit, Pws, None, None, None, iterations
+
+    # Range of points for extrapolation of the curve
+    Q_range = np.linspace(0, AOF, 500)
+    Pwf_fit = curve_IPR(Q_range, [a_fit, b_fit, Pws])
+
+    return a_fit, b_fit, Pws, AOF, Q_range, Pwf_fit, iterations
+
+# IPR plot of the fitted curve, rendered once per fit and reused on every rerun
+@st.cache_data(max_entries=32)
+def plot_IPR(Q_data, Pwf_data, Q_range, Pwf_fit):
+    fig, ax = plt.subplots()
+    ax.scatter(Q_data, Pwf_data, color='red', label='Test Data')
+    ax.plot(Q_range, Pwf_fit, color='blue', label='IPR (Fitted Curve)')
+    ax.set_xlabel('Rate (km$^3$/ d)')
+    ax.set_ylabel('Pressure (bar)')
+    ax.set_title('Pressure vs Rate')
+    ax.legend()
+    ax.grid(True)
+
+    # Set the limits of the axes to ensure the plot starts at (0, 0)
+    ax.set_xlim(left=0, auto=True)
+    ax.set_ylim(bottom=0, auto=True)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
 def main():
     # Load test data
     data = collect_data()
@@ -64,21 +116,28 @@ def main():
         Pwf_data = data["Pwf (bar)"]
         Q_data = data["Rate (km3/d)"]
 
-        # Define error function to minimize
-        def error_function(params):
-            a, b, Pws = params
-            errors = np.log(np.abs(Pws ** 2 - a * Q_data ** 2 - b * Q_data)) - np.log(np.abs(Pwf_data ** 2))
-            squared_errors = np.sum(errors ** 2)
-            scaled_squared_errors = squared_errors * 1000
-            return scaled_squared_errors
-
-        # Perform optimization
-        initial_guess = [1.65e-2, 4.17e-1, Pws]  #this units are in bar2/km3/d
-        bounds = [(0, np.inf), (0, np.inf), (Pws - 1e-9, Pws + 1e-9)]
-        result = minimize(error_function, initial_guess, bounds=bounds)
-
-        # Extract optimized parameters
-        a_fit, b_fit, Pws_fit = result.x
+        solver = st.radio("Solver", ('minimize', 'least_squares'), horizontal=True,
+                          help="least_squares fits the residuals of the error function with their exact Jacobian")
+
+        start = st.radio("Initial guess", ('default', 'linear pre-fit', 'previous coefficients'), horizontal=True,
+                         help="Start the solver from a closed-form linear fit of the test data or from known "
+                              "coefficients instead of a fixed guess. least_squares always starts from the linear "
+                              "pre-fit by default.")
+        warm_start = None
+        if start == 'linear pre-fit':
+            warm_start = 'linear'
+        elif start == 'previous coefficients':
+            col1, col2 = st.columns(2)
+            a_prior = col1.number_input("a (bar2/(Sm3/day)2)", value=1.65e-8, format="%.2e")
+            b_prior = col2.number_input("b (bar2/Sm3/day)", value=4.17e-4, format="%.2e")
+            warm_start = (a_prior * 1e6, b_prior * 1e3)
+
+        # Fitted state, memoized on the test data
+        a_fit, b_fit, Pws_fit, AOF, Q_range, Pwf_fit, iterations = fit_IPR(Pws, Pwf_data, Q_data, solver, warm_start)
+        if iterations is None:
+            st.caption("Fit reused from a previous run with the same test data and initial guess")
+        else:
+            st.caption(f"Solver iterations: {iterations}")
 
         st.header("Fitted Parameters:")
         col1, col2 = st.columns(2)
@@ -86,34 +145,14 @@ def main():
         col1.metric(label=f":green[b (bar2/Sm3/day)]", value=f"{b_fit/1e3:.2e}")
         col2.metric(label=f":black[Reservoir Pressure (bar)]", value=f"{Pws_fit:.2f}")
 
-        # AOF Calculation
-        discriminant = b_fit ** 2 + 4 * a_fit * Pws_fit ** 2
-        if discriminant >= 0:
-            AOF = (-b_fit + np.sqrt(discriminant)) / (2 * a_fit)
-            col2.metric(label=f":blue[AOF (km3/d)]", value=f"{AOF:.2f}")
-        else:
+        if AOF is None:
             st.write("No real roots exist.")
-
-        # Range of points for extrapolation of the curve
-        Q_range = np.linspace(0, AOF, 500)
-        Pwf_fit = curve_IPR(Q_range, [a_fit, b_fit, Pws_fit])
+            return
+        col2.metric(label=f":blue[AOF (km3/d)]", value=f"{AOF:.2f}")
 
         # Plot
         st.subheader("IPR Plot")
-        fig, ax = plt.subplots()
-        ax.scatter(Q_data, Pwf_data, color='red', label='Test Data')
-        ax.plot(Q_range, Pwf_fit, color='blue', label='IPR (Fitted Curve)')
-        ax.set_xlabel('Rate (km$^3$/ d)')
-        ax.set_ylabel('Pressure (bar)')
-        ax.set_title('Pressure vs Rate')
-        ax.legend()
-        ax.grid(True)
-
-        # Set the limits of the axes to ensure the plot starts at (0, 0)
-        ax.set_xlim(left=0, auto=True)
-        ax.set_ylim(bottom=0, auto=True)
-
-        st.pyplot(fig)
+        st.image(plot_IPR(Q_data, Pwf_data, Q_range, Pwf_fit))
 
         st.divider()
       
@@ -152,29 +191,20 @@ def main():
         AOF_or=AOF
         Pws_or=Pws
         
-        def calculate_AOF_new(AOF_or, Pws_or, Pws_new, n):
-            AOF_new = AOF_or * (Pws_new / Pws_or) ** (2 * n)
-            return AOF_new
-        
-        # Future IPR
-        def curve_IPR_future(Q, a, b, Pws_new):
-            return np.sqrt(-a * Q ** 2 - b * Q + Pws_new ** 2)
-        
         # Calculate new AOF
-        AOF_new = calculate_AOF_new(AOF, Pws, Pws_new, n)
+        AOF_new = fetkovich_AOF('Gas', AOF, Pws, Pws_new, n)
         st.write("")
         st.write(f"AOF: {AOF_new:.2f} km3/d when reservoir pressure is {Pws_new} bar")
         
-        # Range of points for extrapolation of the future curve
-        Q_range_or = np.linspace(0, AOF_or, 500)
+        # Range of points for extrapolation of the future curve (the fitted curve is reused as is)
         Q_range_new = np.linspace(0, AOF_new, 500)
-        Pwf_fit_new = curve_IPR_future(Q_range_new, a_fit, b_fit, Pws_new)
+        Pwf_fit_new = curve_IPR(Q_range_new, [a_fit, b_fit, Pws_new])
         
         # Plot
         st.subheader("Future IPR Plot")
         fig, ax = plt.subplots()
         ax.scatter(data["Rate (km3/d)"], data["Pwf (bar)"], color='red', label='Test Data ')
-        ax.plot(Q_range_or, Pwf_fit, color='blue', label='IPR (Fitted Curve)')
+        ax.plot(Q_range, Pwf_fit, color='blue', label='IPR (Fitted Curve)')
         ax.plot(Q_range_new, Pwf_fit_new, color='green', linestyle='--', label='IPR Sensitivity')
         ax.set_xlabel('Rate (km$^3$/ d)')
         ax.set_ylabel('Pressure (bar)')
@@ -185,6 +215,7 @@ def main():
         ax.set_ylim(0, ax.get_ylim()[1])
         
         st.pyplot(fig)
+        plt.close(fig)
 
     else:
         st.write("No data provided.")
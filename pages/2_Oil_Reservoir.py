@@ -1,9 +1,16 @@
+import io
+
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize import minimize
 import pandas as pd
 
+from ipr.cache import fit_cache
+from ipr.fitting import coefficients_frame, fit_params_cached
+from ipr.models import curve_IPR_Vogel
+from ipr.sensitivity import fetkovich_AOF
+from ipr.wells import WellIndex
+
 st.page_link("Homepage.py", label="Go back to Homepage")
 st.title("Oil Reservoir")
 
@@ -19,10 +26,6 @@ st.latex(r'''(Q= AOF \cdot \left[1-0.2\frac{Pwf}{Pws}-0.8\left(\frac{Pwf}{Pws}\r
 
 st.divider()
 
-# Definition of the curve equation (Vogel IPR)
-def curve_IPR_Vogel(Pwf, Pws, Qmax):
-    return Qmax * (1 - 0.2 * (Pwf / Pws) - 0.8 * (Pwf / Pws)**2)
-    
 # Function to collect input data
 def collect_data():
     st.header("Input Test Data")
@@ -43,6 +46,49 @@ def collect_data():
 
     return pd.DataFrame(data, columns=["Date", "Comment", "Pws (bar)", "Pwf (bar)", "Rate (m3/d)"])
 
+# Fit the Vogel IPR to the test data with the minimize solver of ipr.fitting and the shared fit cache.
+# warm_start is None, 'linear' or the Qmax of a previous fit (see initial_params): returns Qmax, the fitted
+# curve and the solver iterations (None when the fit was found in the fit cache).
+# Memoized on the test data, so changing the sensitivity inputs doesn't refit the curve
+@st.cache_data(max_entries=32)
+def fit_IPR_Vogel(Pws, Pwf_data, Q_data, warm_start=None):
+    index = WellIndex.single_well('Well', Pws, Pwf_data, Q_data)
+    if isinstance(warm_start, float):
+        warm_start = coefficients_frame('Oil', index.wells, index.Pws, np.array([[warm_start]]), shut_in=[0])
+    params, diagnostics = fit_params_cached(fit_cache, 'Oil', index, solver='minimize', warm_start=warm_start)
+    iterations = None
+    if diagnostics['Solver message'].iloc[0] != 'cached':
+        iterations = int(diagnostics['Iterations'].iloc[0])
+
+    Qmax_fit = params[0, 0]
+
+    # Generate curve points for plotting
+    Pwf_range = np.linspace(0, min(np.max(Pwf_data), Pws), 500)
+    Qmax_curve_fit = curve_IPR_Vogel(Pwf_range, Pws, Qmax_fit)
+
+    return Qmax_fit, Pwf_range, Qmax_curve_fit, iterations
+
+# IPR plot of the fitted curve, rendered once per fit and reused on every rerun
+@st.cache_data(max_entries=32)
+def plot_IPR_Vogel(Q_data, Pwf_data, Pwf_range, Qmax_curve_fit):
+    fig, ax = plt.subplots()
+    ax.scatter(Q_data, Pwf_data, color='red', label='Pres and Test Data') # corrected scatter plot arguments
+    ax.plot(Qmax_curve_fit, Pwf_range, color='blue', label='IPR (Fitted Curve)')
+    ax.set_xlabel('Rate (m$^3$/ d)')
+    ax.set_ylabel('Pressure (bar)')
+    ax.set_title('Pressure vs Rate')
+    ax.legend()
+    ax.grid(True)
+
+    # Set the limits of the axes to ensure the plot starts at (0, 0)
+    ax.set_xlim(left=0)  # Setting only the left limit to 0
+    ax.set_ylim(bottom=0) # Setting only the bottom limit to 0
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
 def main():
     # Load test data
     data = collect_data()
@@ -55,46 +101,30 @@ def main():
         new_row = {'Date': 'Initial', 'Comment': 'Initial condition', 'Pws (bar)': Pws, 'Pwf (bar)': Pws, 'Rate (m3/d)': 0} # Corrected column name
         data = data.append(new_row, ignore_index=True)
 
-        # Error function to minimize
-        def error_function(params, Pwf, Q, Pws):
-            Qmax = params[0]
-            predicted_Q = curve_IPR_Vogel(Pwf, Pws, Qmax)
-            errors = np.log(predicted_Q) - np.log(Q)
-            squared_errors = np.sum(errors ** 2)
-            scaled_squared_errors = squared_errors * 1000
-            return scaled_squared_errors
-        
-        # Perform optimization
-        initial_guess = [10]  # Initial guess for Qmax
-        bounds = [(0, np.inf)]  # Define bounds for Qmax
-        result = minimize(error_function, initial_guess, args=(data["Pwf (bar)"], data["Rate (m3/d)"], Pws), bounds=bounds)
-
-        Qmax_fit = result.x[0]
+        start = st.radio("Initial guess", ('default', 'linear pre-fit', 'previous Qmax'), horizontal=True,
+                         help="Start the solver from a closed-form fit of the test data or from a known Qmax "
+                              "instead of a fixed guess")
+        warm_start = None
+        if start == 'linear pre-fit':
+            warm_start = 'linear'
+        elif start == 'previous Qmax':
+            warm_start = float(st.number_input("Qmax (m3/d)", min_value=0.0, value=10.0))
+
+        # Fitted state, memoized on the test data
+        Qmax_fit, Pwf_range, Qmax_curve_fit, iterations = fit_IPR_Vogel(Pws, data["Pwf (bar)"], data["Rate (m3/d)"],
+                                                                        warm_start)
+        if iterations is None:
+            st.caption("Fit reused from a previous run with the same test data and initial guess")
+        else:
+            st.caption(f"Solver iterations: {iterations}")
         st.header("Fitted Parameters:")
         col1, col2 = st.columns(2)
         col1.metric(label=f":black[Reservoir Pressure (bar)]", value=f"{Pws:.2f}")
         col2.metric(label=f":green[AOF (m3/d)]", value=f"{Qmax_fit:.2f}")
 
-        # Generate curve points for plotting
-        Pwf_range = np.linspace(0, min(np.max(data["Pwf (bar)"]), Pws), 500)
-        Qmax_curve_fit =curve_IPR_Vogel(Pwf_range, Pws, Qmax_fit)
-        
         # Plot
         st.subheader("IPR Plot")
-        fig, ax = plt.subplots()
-        ax.scatter(data["Rate (m3/d)"], data["Pwf (bar)"], color='red', label='Pres and Test Data') # corrected scatter plot arguments
-        ax.plot(Qmax_curve_fit, Pwf_range, color='blue', label='IPR (Fitted Curve)')
-        ax.set_xlabel('Rate (m$^3$/ d)')
-        ax.set_ylabel('Pressure (bar)')
-        ax.set_title('Pressure vs Rate')
-        ax.legend()
-        ax.grid(True)
-        
-        # Set the limits of the axes to ensure the plot starts at (0, 0)
-        ax.set_xlim(left=0)  # Setting only the left limit to 0
-        ax.set_ylim(bottom=0) # Setting only the bottom limit to 0
-        
-        st.pyplot(fig)
+        st.image(plot_IPR_Vogel(data["Rate (m3/d)"], data["Pwf (bar)"], Pwf_range, Qmax_curve_fit))
 
         st.divider()
         st.write("Error function to minimize by solver during curve fitting:")
@@ -130,22 +160,14 @@ def main():
         Pws_or = Pws
         AOF_or=Qmax_fit
         
-        def calculate_AOF_new(AOF_or, Pws_or, Pws_new, n):
-            AOF_new = AOF_or * (Pws_new / Pws_or) ** (2 * n + 1)
-            return AOF_new
-        
-        AOF_new = calculate_AOF_new(Qmax_fit, Pws_or, Pws_new, n)
+        AOF_new = fetkovich_AOF('Oil', Qmax_fit, Pws_or, Pws_new, n)
         st.write("")
         st.write(f"AOF: {AOF_new:.2f} km3/d when reservoir pressure is {Pws_new} bar")
         
-        # Adjusted curve equation for Vogel IPR
-        def curve_IPR_Vogel_new(Pwf, Pws, AOF_new):
-            return AOF_new * (1 - 0.2 * (Pwf / Pws) - 0.8 * (Pwf / Pws) ** 2)
-        
         # Range of points for extrapolation of the curve
         Pwf_range = np.linspace(0, 500, 500)  # Adjust the range as needed
         Qmax_curve_fit = curve_IPR_Vogel(Pwf_range, Pws, AOF_or)
-        Qmax_curve_fit_new = curve_IPR_Vogel_new(Pwf_range, Pws_new, AOF_new)
+        Qmax_curve_fit_new = curve_IPR_Vogel(Pwf_range, Pws_new, AOF_new)
         
         # Plot
         st.subheader("IPR Plot with Sensitivity Analysis")
@@ -164,6 +186,7 @@ def main():
         ax.set_ylim(bottom=0)
         
         st.pyplot(fig)
+        plt.close(fig)
 
 
 if __name__ == "__main__":
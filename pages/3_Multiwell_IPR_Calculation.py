@@ -1,94 +1,41 @@
+import io
+import os
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-from scipy.optimize import minimize
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
-# Definition of the quadratic curve equation (Inflow Performance Relationship - IPR)
-def curve_IPR(Q, params):
-    a, b, Pws = params
-    return np.sqrt(-a * Q ** 2 - b * Q + Pws ** 2)
-
-# Definition of the curve equation (Vogel IPR)
-def curve_IPR_Vogel(Pwf, Pws, Qmax):
-    return Qmax * (1 - 0.2 * (Pwf / Pws) - 0.8 * (Pwf / Pws) ** 2)
-
-# Error function to minimize for quadratic IPR
-def error_function(params, data):
-    Q = data["Rate (km3/d)"]
-    Pwf = data["BHP (bar)"]
-    Pws = data["Pres (bar)"]
-    a, b, Pws = params
-    errors = np.log(np.abs(Pws ** 2 - a * Q ** 2 - b * Q)) - np.log(np.abs(Pwf ** 2))
-    squared_errors = np.sum(errors ** 2)
-    scaled_squared_errors = squared_errors * 1000
-    return scaled_squared_errors
-
-# Error function to minimize for Vogel IPR
-def error_function_vogel(params, Pwf, Q, Pws):
-    Qmax = params[0]
-    predicted_Q = curve_IPR_Vogel(Pwf, Pws, Qmax)
-    errors = np.log(predicted_Q) - np.log(Q)
-    squared_errors = np.sum(errors ** 2)
-    scaled_squared_errors = squared_errors * 1000
-    return scaled_squared_errors
-
-# Calculate coefficients for each well
-def calculate_coefficients(data, reservoir_type):
-    coefficients_list = []
-
-    for index, well_data in data.groupby("Well"):
-        Pws = well_data["Pres (bar)"].iloc[0]
-
-        if reservoir_type == 'Gas':
-            initial_guess = [1.65e-2, 4.17e-1, Pws]  # Initial guess for optimization
-            bounds = [(0, np.inf), (0, np.inf), (Pws - 1e-9, Pws + 1e-9)]  # Bounds for parameters
-            result = minimize(error_function, initial_guess, args=(well_data,), bounds=bounds)
-
-            a_fit, b_fit, Pws_fit = result.x
-            discriminant = b_fit ** 2 + 4 * a_fit * Pws_fit ** 2
-            if discriminant >= 0:
-                AOF = (-b_fit + np.sqrt(discriminant)) / (2 * a_fit)
-            else:
-                AOF = np.nan
-
-            coefficients_list.append({
-                'Well': index,
-                'Pres (bar)': Pws,
-                'a (bar2/(m3/d)2)': result.x[0] / 1e6,
-                'b (bar2/m3/d)': result.x[1] / 1000,
-                'AOF (km3/d)': AOF
-            })
-
-        elif reservoir_type == 'Oil':
-            initial_guess = [10]  # Initial guess for Qmax
-            bounds = [(0, np.inf)]  # Define bounds for Qmax
-            result = minimize(error_function_vogel, initial_guess, args=(well_data["BHP (bar)"], well_data["Rate (m3/d)"], Pws), bounds=bounds)
-
-            Qmax_fit = result.x[0]
-
-            coefficients_list.append({
-                'Well': index,
-                'Pres (bar)': Pws,
-                'Qmax (m3/d)': Qmax_fit
-            })
-
-    # Convert list of dictionaries to DataFrame
-    coefficients_df = pd.DataFrame(coefficients_list)
-
-    return coefficients_df
+from ipr.cache import fit_cache
+from ipr.curves import CurveStore
+from ipr.field import allocate_rate, field_IPR
+from ipr.history import CALENDAR_FREQUENCIES, calculate_history
+from ipr.fitting import (DIAGNOSTIC_COLUMNS, bootstrap_frame, bootstrap_params, calculate_coefficients,
+                         coefficients_params, solver_summary)
+from ipr.overview import figure_overview
+from ipr.plots import figure_field_IPR, figure_IPR_curve, figure_png, figure_Vogel_curve
+from ipr.report import report_bytes
+from ipr.sensitivity import SensitivityCube, pressure_grid
+from ipr.streaming import stream_coefficients
+from ipr.tables import MIME_TYPES, TEST_COLUMNS, read_table, table_bytes
+from ipr.validation import validate_tests, validation_summary
+from ipr.wells import WellIndex
+
+# Extensions accepted by the file uploaders (see ipr.tables)
+TABLE_TYPES = ["csv", "parquet", "pq", "feather", "arrow"]
 
 def main():
     st.title('Multiwell IPR Calculation')
 
-    intro=('''In order to perform the curve fitting for several wells a .csv file needs to be loaded with the folliowing format. 
+    intro=('''In order to perform the curve fitting for several wells a .csv (or .parquet / .feather) file needs to be loaded with the folliowing format. 
 
 | Well | Pres (bar) | BHP (bar) | Rate (km3/d) for gas / Rate (m3/d) for oil |
 |------|------------|-----------|----------------------------------------------|
 |      |            |           |                                              |
 
 
-*Note that all test data should be referenced to the same reservoir pressure*. ''')
+*Note that all test data should be referenced to the same reservoir pressure*. An optional Date column
+enables the IPR history of every well over time windows.''')
 
     st.markdown(intro)
 
@@ -96,91 +43,305 @@ def main():
 
     reservoir_type = st.radio("Select Reservoir Type:", ('Gas', 'Oil'))
 
-    uploaded_file = st.file_uploader("Upload CSV file", type=["csv"])
+    with st.expander("Solver settings"):
+        solver = st.radio("Solver", ('batch', 'minimize', 'least_squares'),
+                          help="batch fits all wells at once, minimize runs scipy's minimize for each well, "
+                               "least_squares runs scipy's least_squares with exact Jacobians for each well")
+        backend = st.selectbox("Execution backend (per-well solvers only)", ('serial', 'threads', 'processes'))
+        max_workers = st.number_input("Workers", min_value=1, value=os.cpu_count() or 1)
+        streaming = st.radio("Ingestion", ('full', 'sorted', 'statistics'),
+                             help="full loads the whole file. For very large files, sorted reads it in chunks and "
+                                  "fits wells as they complete (rows of a well must be contiguous), statistics "
+                                  "reads it in chunks in any order and fits from per-well sums (linear fit for gas, "
+                                  "batch solver only, no bootstrap). "
+                                  "IPR curves are not drawn when streaming.")
+        warm_start = st.radio("Warm start (per-well solvers only)", ('none', 'linear pre-fit', 'previous coefficients'),
+                              help="Start every well from a closed-form linear fit or from the coefficients of a "
+                                   "previous run instead of a fixed initial guess")
+        prior_file = None
+        if warm_start == 'previous coefficients':
+            prior_file = st.file_uploader("Previous coefficients", type=TABLE_TYPES,
+                                          help="A coefficients table downloaded from this page")
+        bootstrap = st.number_input("Bootstrap resamples", min_value=0, max_value=5000, value=0, step=100,
+                                    help="Resample the tests of every well this many times and report P10/P50/P90 "
+                                         "of the coefficients (0 to skip)")
+        instrument = st.checkbox("Solver diagnostics",
+                                 help="Add fit time, function evaluations, iterations, final loss and convergence "
+                                      "status of every well to the table")
+
+    uploaded_file = st.file_uploader("Upload CSV, Parquet or Feather file", type=TABLE_TYPES)
     if uploaded_file is not None:
-        data = pd.read_csv(uploaded_file)
-
-        coefficients_df = calculate_coefficients(data, reservoir_type)
+        settings = dict(solver=solver, backend=backend, max_workers=int(max_workers), cache=fit_cache,
+                        instrument=instrument, bootstrap=int(bootstrap))
+        if warm_start == 'linear pre-fit':
+            settings['warm_start'] = 'linear'
+        elif prior_file is not None:
+            settings['warm_start'] = read_table(prior_file)
+
+        if streaming == 'full':
+            data = read_table(uploaded_file, TEST_COLUMNS)
+            try:
+                valid_data, report = validate_tests(data, reservoir_type)
+            except ValueError as error:
+                st.error(str(error))
+                return
+            show_validation(report, data, valid_data)
+            if valid_data.empty:
+                st.error("No well has a valid test to fit.")
+                return
+            index = WellIndex.from_data(valid_data, reservoir_type)
+            history_data = valid_data if "Date" in valid_data.columns else None
+            # The bootstrap doesn't go through the fit cache, it is memoized on its own (see bootstrap_table)
+            coefficients_df = calculate_coefficients(index, reservoir_type, **dict(settings, bootstrap=0))
+            if bootstrap:
+                diagnostics = coefficients_df.columns.intersection(DIAGNOSTIC_COLUMNS)
+                coefficients_df = pd.concat([coefficients_df.drop(columns=diagnostics),
+                                             bootstrap_table(reservoir_type, index.offsets, index.Pws, index.Pwf,
+                                                             index.Q, int(bootstrap)),
+                                             coefficients_df[diagnostics]], axis=1)
+        else:
+            index = None
+            history_data = None
+            progress = st.empty()
+            parts = []
+            try:
+                for part in stream_coefficients(uploaded_file, reservoir_type, mode=streaming, validate=True,
+                                                **settings):
+                    parts.append(part)
+                    progress.write(f"{sum(len(part) for part in parts)} wells fitted...")
+            except ValueError as error:
+                progress.empty()
+                st.error(str(error))
+                return
+            progress.empty()
+            # Validation can drop every row: sorted mode then yields nothing, statistics mode an empty table
+            if not sum(len(part) for part in parts):
+                st.error("No well has a valid test to fit.")
+                return
+            coefficients_df = pd.concat(parts, ignore_index=True)
+        cache_stats = fit_cache.stats()
+        st.caption(f"Fit cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                   f"{cache_stats['entries']} stored fits")
+
+        if instrument:
+            show_solver_summary(coefficients_df)
 
         st.write("Data with IPR coefficients:")
         if reservoir_type == 'Gas':
             coefficients_df_formatted = format_coefficients(coefficients_df)
             st.write(coefficients_df_formatted)
-            if st.button("Download Coefficients as CSV"):
-                download_csv(coefficients_df_formatted)
+            download_coefficients(coefficients_df, coefficients_df_formatted)
         else:  # For Oil reservoir type, no formatting is applied
             st.write(coefficients_df)
-            if st.button("Download Coefficients as CSV"):
-                download_csv(coefficients_df)
-
-
-        st.write("## IPR Curves")
-        for well_name, well_data in data.groupby("Well"):
-            st.write(f"### Well {well_name}")
-            if reservoir_type == 'Gas':
-                plot_IPR_curve(well_data, coefficients_df[coefficients_df['Well'] == well_name])
-            elif reservoir_type == 'Oil':
-                plot_Vogel_curve(well_data, coefficients_df[coefficients_df['Well'] == well_name])
+            shut_in_points = coefficients_df['Shut-in points'].sum()
+            if shut_in_points > 0:
+                st.warning(f"{shut_in_points} shut-in test points (Rate = 0) were left out of the fit.")
+            download_coefficients(coefficients_df, coefficients_df)
+
+        show_field_IPR(coefficients_df, reservoir_type)
+        show_sensitivity(coefficients_df, reservoir_type)
+
+        show_overview(coefficients_df, reservoir_type, index)
+        if history_data is not None:
+            show_history(history_data, reservoir_type)
+
+        if index is None:
+            return
+
+        show_report(coefficients_df, reservoir_type, index, int(max_workers))
+        show_well_plots(index, coefficients_df, reservoir_type)
+
+# Wells skipped or with warnings from the pre-fit validation of the uploaded tests
+def show_validation(report, data, valid_data):
+    if report.empty:
+        return
+    with st.expander("Data validation", expanded=(report['Status'] == 'skipped').any()):
+        st.warning(validation_summary(report, data, valid_data))
+        st.write(report)
+
+# IPR of every well over rolling or calendar windows of its test dates, fitted as one batch
+def show_history(data, reservoir_type):
+    with st.expander("IPR history"):
+        windows = st.radio("Windows", ('rolling', 'calendar'), horizontal=True)
+        col1, col2 = st.columns(2)
+        if windows == 'rolling':
+            window = col1.number_input("Window (days)", min_value=1, value=180)
+            step = col2.number_input("Step (days)", min_value=1, value=30)
+            settings = dict(window=int(window), step=int(step))
+        else:
+            settings = dict(calendar=col1.selectbox("Period", tuple(CALENDAR_FREQUENCIES)))
+        min_tests = col2.number_input("Minimum flowing tests per window", min_value=1,
+                                      value=2 if reservoir_type == 'Gas' else 1)
+
+        history_df = calculate_history(data, reservoir_type, min_tests=int(min_tests), **settings)
+        st.caption(f"{len(history_df)} windows of {history_df['Well'].nunique()} wells")
+        st.write(history_df)
+
+        column = 'AOF (km3/d)' if reservoir_type == 'Gas' else 'Qmax (m3/d)'
+        wells = st.multiselect("Wells to plot", history_df['Well'].unique(),
+                               default=list(history_df['Well'].unique()[:5]))
+        if wells:
+            st.line_chart(history_df[history_df['Well'].isin(wells)].pivot_table(
+                index='Window start', columns='Well', values=column))
+        st.download_button(label="Download history as CSV", data=history_df.to_csv(index=False),
+                           file_name='ipr_history.csv', mime='text/csv')
+
+# Zip report with the coefficients and the IPR plot of every well, rendered on a process pool
+def show_report(coefficients_df, reservoir_type, index, max_workers):
+    with st.expander("Report"):
+        image_format = st.radio("Plot format", ('png', 'pdf'), horizontal=True)
+        if st.button("Build report"):
+            progress = st.progress(0.0)
+            report = report_bytes(coefficients_df, reservoir_type, index, image_format=image_format,
+                                  max_workers=max_workers,
+                                  progress=lambda done, total: progress.progress(done / total))
+            progress.empty()
+            st.download_button(label="Download report (.zip)", data=report, file_name='ipr_report.zip',
+                               mime='application/zip')
+
+# One interactive chart of all wells (test data only when the whole file was loaded), filtered by AOF /
+# Qmax range and with some wells highlighted
+def show_overview(coefficients_df, reservoir_type, index):
+    with st.expander("Field overview", expanded=True):
+        column = 'AOF (km3/d)' if reservoir_type == 'Gas' else 'Qmax (m3/d)'
+        values = coefficients_df[column].to_numpy(dtype=float)
+        finite = np.isfinite(values)
+        if not finite.any():
+            st.write("No well with a finite AOF to show.")
+            return
+
+        low, high = float(values[finite].min()), float(values[finite].max())
+        if low < high:
+            low, high = st.slider(f"{column} range", min_value=low, max_value=high, value=(low, high))
+        positions = np.flatnonzero(finite & (values >= low) & (values <= high))
+        highlight = st.multiselect("Highlight wells", coefficients_df['Well'].to_numpy()[positions])
+
+        visible_index = None if index is None else index.subset(positions)
+        fig = figure_overview(coefficients_df.iloc[positions], reservoir_type, visible_index, highlight=highlight)
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{len(positions)} of {len(coefficients_df)} wells shown")
+
+# IPR plots of the selected wells, or of one page of wells, so rendering time and memory depend on the
+# wells viewed rather than the wells uploaded. Well i of the index is row i of coefficients_df.
+def show_well_plots(index, coefficients_df, reservoir_type):
+    st.write("## IPR Curves")
+    selected = st.multiselect("Wells", index.wells, help="Leave empty to browse all wells page by page")
+    if selected:
+        positions = np.array([index.position(well) for well in selected])
+    else:
+        col1, col2 = st.columns(2)
+        page_size = col1.selectbox("Wells per page", (10, 25, 50, 100))
+        pages = max(-(-len(index) // page_size), 1)
+        page = col2.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+        positions = np.arange((page - 1) * page_size, min(page * page_size, len(index)))
+
+    visible_df = coefficients_df.iloc[positions]
+    params = coefficients_params(reservoir_type, visible_df)
+    curves = CurveStore.from_coefficients(visible_df, reservoir_type)
+    for k, i in enumerate(positions):
+        well_name = index.wells[i]
+        st.write(f"### Well {well_name}")
+        Pwf, Q = index.test_data(i)
+        if reservoir_type == 'Gas':
+            st.image(plot_IPR_curve(well_name, Q, Pwf, index.Pws[i], params[k, 0], params[k, 1],
+                                    visible_df['AOF (km3/d)'].iloc[k], curves.curve(k)))
+        elif reservoir_type == 'Oil':
+            st.image(plot_Vogel_curve(well_name, Q, Pwf, index.Pws[i], params[k, 0], curves.curve(k)))
+
+def show_solver_summary(coefficients_df):
+    summary = solver_summary(coefficients_df)
+    st.write("### Solver Summary")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(label="Total fit time (s)", value=f"{summary['Total time (s)']:.2f}")
+    col2.metric(label="Wells", value=summary['Wells'])
+    col3.metric(label="Mean iterations", value=f"{summary['Mean iterations']:.1f}")
+    col4.metric(label="Not converged", value=summary['Failures'])
+    st.write("Slowest wells:")
+    st.write(summary['Slowest wells'][['Well'] + DIAGNOSTIC_COLUMNS])
+
+# Field IPR of all fitted wells and the common bottomhole (manifold) pressure that delivers a target
+# total rate, with the rate allocated to every well
+def show_field_IPR(coefficients_df, reservoir_type):
+    with st.expander("Field IPR and rate allocation"):
+        rate_unit = 'km$^3$/d' if reservoir_type == 'Gas' else 'm$^3$/d'
+        Pwf, total_rate = field_IPR(coefficients_df, reservoir_type)
+        target_rate = st.number_input("Target total rate (km3/d for gas, m3/d for oil)", min_value=0.0,
+                                      value=float(total_rate[0] / 2) if len(total_rate) else 0.0)
+
+        target_Pwf, rates = allocate_rate(coefficients_df, reservoir_type, target_rate)
+        if np.isfinite(target_Pwf[0]):
+            st.metric(label="Common bottomhole pressure (bar)", value=f"{target_Pwf[0]:.2f}")
+            allocation = pd.DataFrame({'Well': coefficients_df['Well'], 'Pres (bar)': coefficients_df['Pres (bar)'],
+                                       'Allocated rate': rates[:, 0]})
+            st.write(allocation)
+        else:
+            st.warning(f"The target rate exceeds the field AOF ({total_rate[0]:.2f}).")
+
+        fig = figure_field_IPR(Pwf, total_rate, rate_unit, target_rate, target_Pwf[0])
+        st.pyplot(fig)
+        plt.close(fig)
+
+# Fetkovich depletion sensitivity of every well over a grid of future reservoir pressures (fractions of
+# the current pressure of each well) and exponents n
+def show_sensitivity(coefficients_df, reservoir_type):
+    with st.expander("Depletion sensitivity - Fetkovich Method"):
+        col1, col2 = st.columns(2)
+        fractions = col1.slider("Future reservoir pressure (fraction of current)", min_value=0.05, max_value=1.0,
+                                value=(0.5, 1.0))
+        n_pressures = col1.number_input("Pressures", min_value=1, max_value=200, value=10)
+        exponents = col2.slider("n", min_value=0.1, max_value=1.0, value=(0.5, 1.0))
+        n_exponents = col2.number_input("Exponents", min_value=1, max_value=50, value=6)
+
+        fractions = np.linspace(fractions[0], fractions[1], int(n_pressures))
+        cube = SensitivityCube.from_coefficients(coefficients_df, reservoir_type,
+                                                 pressure_grid(coefficients_df['Pres (bar)'], fractions),
+                                                 np.linspace(exponents[0], exponents[1], int(n_exponents)))
+
+        unit = 'AOF (km3/d)' if reservoir_type == 'Gas' else 'Qmax (m3/d)'
+        st.write(f"Field total {unit} by pressure fraction (rows) and n (columns):")
+        st.write(pd.DataFrame(cube.field_AOF(), index=pd.Index(fractions.round(3), name='Pws fraction'),
+                              columns=pd.Index(cube.n.round(3), name='n')))
+
+        buffer = io.BytesIO()
+        cube.save(buffer)
+        st.download_button(label="Download sensitivity cube (.npz)", data=buffer.getvalue(),
+                           file_name='sensitivity.npz', mime='application/octet-stream')
 
 def format_coefficients(coefficients_df):
     coefficients_df_formatted = coefficients_df.copy()
-    coefficients_df_formatted['a (bar2/(m3/d)2)'] = coefficients_df['a (bar2/(m3/d)2)'].apply(lambda x: f'{x:.2e}')
-    coefficients_df_formatted['b (bar2/m3/d)'] = coefficients_df['b (bar2/m3/d)'].apply(lambda x: f'{x:.2e}')
+    # a and b, and their bootstrap percentiles if any
+    for column in coefficients_df.columns:
+        if column.startswith(('a (bar2/(m3/d)2)', 'b (bar2/m3/d)')):
+            coefficients_df_formatted[column] = coefficients_df[column].apply(lambda x: f'{x:.2e}')
     return coefficients_df_formatted
 
-def download_csv(dataframe):
-    csv = dataframe.to_csv(index=False)
+# CSV gets the table as displayed, Parquet and Feather the unformatted one with its dtypes
+def download_coefficients(coefficients_df, formatted_df):
+    label = st.radio("Download format", ('CSV', 'Parquet', 'Feather'), horizontal=True)
+    file_format = label.lower()
+    table = formatted_df if file_format == 'csv' else coefficients_df
     st.download_button(
-        label="Download CSV",
-        data=csv,
-        file_name='coefficients.csv',
-        mime='text/csv')
-
-def plot_IPR_curve(data, coefficients):
-    well_name = data["Well"].iloc[0]
-    Pws = data["Pres (bar)"].iloc[0]
-    a = coefficients['a (bar2/(m3/d)2)'].values[0] * 1e6
-    b = coefficients['b (bar2/m3/d)'].values[0] * 1000
-    AOF = coefficients['AOF (km3/d)'].values[0]
-
-    Q_range = np.linspace(0, AOF, 500)
-    Pwf_fit = curve_IPR(Q_range, [a, b, Pws])
-
-    fig, ax = plt.subplots()
-    ax.plot(Q_range, Pwf_fit, color='blue', label=f'IPR Curve - Well {well_name}')
-    ax.scatter(data["Rate (km3/d)"], data["BHP (bar)"], color='magenta', label=f'Test Data - Well {well_name}')
-
-    ax.set_xlabel('Rate (km$^3$/d)')
-    ax.set_ylabel('Pressure (bar)')
-    ax.set_title(f'Test Data and IPR Curves for Well {well_name}')
-    ax.legend()
-    ax.grid(True)
-    ax.set_xlim(0, None)
-    ax.set_ylim(0, None)
-
-    st.pyplot(fig)
-
-def plot_Vogel_curve(data, coefficients):
-    well_name = data["Well"].iloc[0]
-    Pws = data["Pres (bar)"].iloc[0]
-    Qmax = coefficients['Qmax (m3/d)'].values[0]
-
-    Pwf_range = np.linspace(0, Pws, 500)
-    Qmax_curve_fit = curve_IPR_Vogel(Pwf_range, Pws, Qmax)
-
-    fig, ax = plt.subplots()
-    ax.plot(Qmax_curve_fit, Pwf_range, color='black', label='IPR (Fitted Curve)')
-    ax.scatter(data["Rate (m3/d)"], data["BHP (bar)"], color='magenta', label='Test Data')
-
-    ax.set_xlabel('Rate (m$^3$/d)')
-    ax.set_ylabel('Pressure (bar)')
-    ax.set_title(f'Pressure vs Rate for Well {well_name}')
-    ax.legend()
-    ax.grid(True)
-    ax.set_xlim(0, ax.get_xlim()[1])
-    ax.set_ylim(0, ax.get_ylim()[1])
-
-    st.pyplot(fig)
+        label=f"Download Coefficients as {label}",
+        data=table_bytes(table, file_format),
+        file_name=f'coefficients.{file_format}',
+        mime=MIME_TYPES[file_format])
+
+# Bootstrap percentiles of every well (see bootstrap_params), computed once per test data and number of
+# resamples and reused on reruns: widget interactions don't redo thousands of resampled fits. The
+# resamples don't depend on the well names, so only the arrays of the index are hashed.
+@st.cache_data(max_entries=10)
+def bootstrap_table(reservoir_type, offsets, Pws, Pwf, Q, replicates):
+    index = WellIndex(np.arange(len(Pws)), offsets, Pws, Pwf, Q)
+    return bootstrap_frame(reservoir_type, bootstrap_params(reservoir_type, index, replicates=replicates))
+
+# PNG of the IPR plot of one well, rendered once per well, test data and coefficients and reused on reruns
+@st.cache_data(max_entries=1000)
+def plot_IPR_curve(well_name, Q, Pwf, Pws, a, b, AOF, curve=None):
+    return figure_png(figure_IPR_curve(well_name, Q, Pwf, Pws, a, b, AOF, curve))
+
+@st.cache_data(max_entries=1000)
+def plot_Vogel_curve(well_name, Q, Pwf, Pws, Qmax, curve=None):
+    return figure_png(figure_Vogel_curve(well_name, Q, Pwf, Pws, Qmax, curve))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from ipr.cache import FitCache
+
+def key(i):
+    return FitCache.key('Gas', [200.0], [150.0 + i], [10.0], solver='batch')
+
+def test_key_depends_on_data_model_and_settings():
+    base = FitCache.key('Gas', [200.0], [150.0], [10.0], solver='batch')
+    assert base == FitCache.key('Gas', np.array([200]), np.array([150]), np.array([10]), solver='batch')
+    assert base != FitCache.key('Oil', [200.0], [150.0], [10.0], solver='batch')
+    assert base != FitCache.key('Gas', [200.0], [150.0], [10.5], solver='batch')
+    assert base != FitCache.key('Gas', [200.0], [150.0], [10.0], solver='minimize')
+
+def test_memory_lru_eviction_and_counters():
+    cache = FitCache(max_entries=2)
+    cache.put(key(0), [1.0, 2.0])
+    cache.put(key(1), [3.0, 4.0])
+    np.testing.assert_array_equal(cache.get(key(0)), [1.0, 2.0])
+    # key(1) is now the least recently used entry
+    cache.put(key(2), [5.0, 6.0])
+    assert cache.get(key(1)) is None
+    assert cache.get(key(0)) is not None and cache.get(key(2)) is not None
+    assert cache.stats() == {'entries': 2, 'hits': 3, 'misses': 1}
+
+    cache.clear()
+    assert cache.stats() == {'entries': 0, 'hits': 0, 'misses': 0}
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    cache = FitCache(max_entries=1, directory=tmp_path)
+    cache.put(key(0), [1.0, 2.0])
+    cache.put(key(1), [3.0, 4.0])
+    # Evicted from memory, read back from disk
+    np.testing.assert_array_equal(cache.get(key(0)), [1.0, 2.0])
+    assert cache.stats()['hits'] == 1
+
+    reopened = FitCache(directory=tmp_path)
+    assert reopened.disk_entries == 2
+    np.testing.assert_array_equal(reopened.get(key(1)), [3.0, 4.0])
+    assert reopened.stats() == {'entries': 1, 'hits': 1, 'misses': 0}
+
+def test_disk_eviction_keeps_the_most_recent_files(tmp_path):
+    cache = FitCache(directory=tmp_path, max_disk_entries=10)
+    for i in range(10):
+        cache.put(key(i), [float(i)])
+        # Distinct modification times, oldest first
+        os.utime(cache.path(key(i)), (i, i))
+    cache.put(key(10), [10.0])
+
+    # Evicted down to 90% of the bound, least recently used files first
+    assert cache.disk_entries == 9
+    kept = {name[:-len('.npy')] for name in os.listdir(tmp_path)}
+    assert kept == {key(i) for i in range(2, 11)}
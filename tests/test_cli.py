@@ -0,0 +1,68 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ipr.cli import main
+from ipr.fitting import calculate_coefficients
+from ipr.history import calculate_history
+from ipr.synthetic import synthetic_field
+from ipr.tables import read_table
+
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+def test_fit_file_with_inferred_reservoir_type(reservoir_type, tmp_path):
+    data, _ = synthetic_field(reservoir_type, 10, noise=0, seed=8)
+    data.to_csv(tmp_path / 'tests.csv', index=False)
+    main([str(tmp_path / 'tests.csv'), '-o', str(tmp_path / 'coefficients.csv')])
+
+    expected = calculate_coefficients(read_table(tmp_path / 'tests.csv'), reservoir_type)
+    pd.testing.assert_frame_equal(read_table(tmp_path / 'coefficients.csv'), expected, check_dtype=False)
+
+def test_options_reach_the_fit(tmp_path, capsys):
+    data, _ = synthetic_field('Gas', 10, seed=8)
+    data.to_parquet(tmp_path / 'tests.parquet', index=False)
+    main([str(tmp_path / 'tests.parquet'), '--wells', 'W2', 'W5', '--solver', 'least_squares', '--diagnostics',
+          '--timing'])
+
+    output = capsys.readouterr()
+    coefficients_df = pd.read_csv(io.StringIO(output.out))
+    assert list(coefficients_df['Well']) == ['W2', 'W5']
+    assert 'Iterations' in coefficients_df.columns
+    expected = calculate_coefficients(data[data['Well'].isin(['W2', 'W5'])], 'Gas', solver='least_squares')
+    np.testing.assert_allclose(coefficients_df['AOF (km3/d)'], expected['AOF (km3/d)'], rtol=1e-6)
+    assert 'fit=' in output.err and 'wells=2' in output.err
+
+def test_validation_report(tmp_path, capsys):
+    data, _ = synthetic_field('Gas', 5, noise=0, seed=8)
+    # One test above the reservoir pressure, and a well without any valid test
+    data.loc[0, 'BHP (bar)'] = data.loc[0, 'Pres (bar)'] + 1
+    data = data[data['Well'] != 'W4']
+    data = pd.concat([data, pd.DataFrame({'Well': ['X'], 'Pres (bar)': [100.0], 'BHP (bar)': [120.0],
+                                          'Rate (km3/d)': [50.0]})])
+    data.to_csv(tmp_path / 'tests.csv', index=False)
+    main([str(tmp_path / 'tests.csv'), '-o', str(tmp_path / 'coefficients.feather'),
+          '--validation-report', str(tmp_path / 'report.csv')])
+
+    report = read_table(tmp_path / 'report.csv').set_index('Well')
+    assert report.loc['W0', 'Status'] == 'warning'
+    assert report.loc['X', 'Status'] == 'skipped'
+    assert list(read_table(tmp_path / 'coefficients.feather')['Well']) == ['W0', 'W1', 'W2', 'W3']
+    assert capsys.readouterr().err
+
+def test_history_windows(tmp_path):
+    data, _ = synthetic_field('Oil', 8, tests=(10, 20), seed=9)
+    data['Date'] = pd.Timestamp('2021-01-01') + pd.to_timedelta(np.arange(len(data)) % 300, unit='D')
+    data.to_parquet(tmp_path / 'tests.parquet', index=False)
+    main([str(tmp_path / 'tests.parquet'), '--window', '90', '--step', '30', '-o', str(tmp_path / 'history.parquet')])
+
+    expected = calculate_history(read_table(tmp_path / 'tests.parquet'), 'Oil', window=90, step=30)
+    pd.testing.assert_frame_equal(read_table(tmp_path / 'history.parquet'), expected, check_dtype=False)
+
+def test_unknown_reservoir_type(tmp_path):
+    pd.DataFrame({'Well': ['A'], 'Pres (bar)': [100.0], 'BHP (bar)': [80.0], 'Rate': [5.0]}).to_csv(
+        tmp_path / 'tests.csv', index=False)
+    with pytest.raises(SystemExit, match="use --reservoir"):
+        main([str(tmp_path / 'tests.csv')])
+    with pytest.raises(SystemExit, match="Missing columns"):
+        main([str(tmp_path / 'tests.csv'), '--reservoir', 'Oil'])
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from ipr.curves import CurveStore
+from ipr.field import well_rates
+from ipr.fitting import calculate_coefficients, coefficients_params
+from ipr.synthetic import synthetic_field
+
+@pytest.fixture(scope='module', params=['Gas', 'Oil'])
+def field(request):
+    data, _ = synthetic_field(request.param, 20, seed=6)
+    coefficients_df = calculate_coefficients(data, request.param)
+    params = coefficients_params(request.param, coefficients_df)
+    return request.param, coefficients_df, params, coefficients_df['Pres (bar)'].to_numpy()
+
+def test_curves_run_from_pws_to_aof(field):
+    reservoir_type, coefficients_df, params, Pws = field
+    store = CurveStore.from_coefficients(coefficients_df, reservoir_type, points=100)
+    assert len(store) == 20 and store.block.dtype == np.float32
+
+    Q, Pwf = store.curve(3)
+    assert Q[0] == 0 and Pwf[-1] == 0
+    np.testing.assert_allclose(Pwf[0], Pws[3], rtol=1e-6)
+    AOF = coefficients_df['AOF (km3/d)' if reservoir_type == 'Gas' else 'Qmax (m3/d)'].iloc[3]
+    np.testing.assert_allclose(Q[-1], AOF, rtol=1e-6)
+    assert np.all(np.diff(Q) >= 0) and np.all(np.diff(Pwf) <= 0)
+
+def test_lookups_match_the_models(field):
+    reservoir_type, coefficients_df, params, Pws = field
+    store = CurveStore.from_coefficients(coefficients_df, reservoir_type, points=2000)
+    # Common pressures below every reservoir pressure, broadcast against the wells
+    Pwf = np.array([10.0, 50.0, 90.0])
+    rates = store.rate_at_pressure(np.arange(20)[:, None], Pwf)
+    assert rates.shape == (20, 3)
+    np.testing.assert_allclose(rates, well_rates(reservoir_type, params, Pws, Pwf), rtol=1e-3)
+
+    pressures = store.pressure_at_rate(np.arange(20)[:, None], rates)
+    np.testing.assert_allclose(pressures, np.broadcast_to(Pwf, rates.shape), rtol=1e-3)
+
+def test_lookups_outside_the_curve_are_nan(field):
+    reservoir_type, coefficients_df, params, Pws = field
+    store = CurveStore.from_coefficients(coefficients_df, reservoir_type)
+    assert np.isnan(store.rate_at_pressure(0, Pws[0] * 1.1))
+    assert np.isnan(store.rate_at_pressure(0, -1.0))
+    assert np.isnan(store.pressure_at_rate(0, store.curve(0)[0][-1] * 1.1))
+
+def test_memory_mapped_store(field, tmp_path):
+    reservoir_type, coefficients_df, params, Pws = field
+    in_memory = CurveStore.from_coefficients(coefficients_df, reservoir_type, points=50)
+    mapped = CurveStore.from_coefficients(coefficients_df, reservoir_type, points=50, path=tmp_path / 'built.npy')
+    assert isinstance(mapped.block, np.memmap)
+    np.testing.assert_array_equal(mapped.block, in_memory.block)
+
+    in_memory.save(tmp_path / 'saved.npy')
+    loaded = CurveStore.load(tmp_path / 'saved.npy', coefficients_df['Well'])
+    assert isinstance(loaded.block, np.memmap) and not loaded.block.flags.writeable
+    assert list(loaded.wells) == list(coefficients_df['Well'])
+    np.testing.assert_array_equal(loaded.rate_at_pressure([0, 5], [100.0, 50.0]),
+                                  in_memory.rate_at_pressure([0, 5], [100.0, 50.0]))
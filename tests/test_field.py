@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from ipr.field import allocate_rate, field_IPR, field_rate
+from ipr.fitting import calculate_coefficients, coefficients_params
+from ipr.synthetic import synthetic_field
+
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+def test_common_pressure_meets_target_rates(reservoir_type):
+    data, _ = synthetic_field(reservoir_type, 25, seed=12)
+    coefficients_df = calculate_coefficients(data, reservoir_type)
+    _, total_rate = field_IPR(coefficients_df, reservoir_type)
+    targets = np.array([0.1, 0.5, 0.9]) * total_rate[0]
+
+    Pwf, rates = allocate_rate(coefficients_df, reservoir_type, targets, tolerance=1e-9)
+    np.testing.assert_allclose(rates.sum(axis=0), targets, rtol=1e-8)
+    assert np.all(np.diff(Pwf) < 0)
+
+    params = coefficients_params(reservoir_type, coefficients_df)
+    Pws = coefficients_df['Pres (bar)'].to_numpy()
+    np.testing.assert_allclose(field_rate(reservoir_type, params, Pws, Pwf), targets, rtol=1e-8)
+
+def test_target_above_field_AOF():
+    data, _ = synthetic_field('Gas', 10, seed=13)
+    coefficients_df = calculate_coefficients(data, 'Gas')
+    field_AOF = coefficients_df['AOF (km3/d)'].sum()
+    Pwf, rates = allocate_rate(coefficients_df, 'Gas', [field_AOF / 2, field_AOF * 2])
+    assert np.isfinite(Pwf[0]) and np.isnan(Pwf[1])
+    assert np.isnan(rates[:, 1]).all()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ipr.cache import FitCache
+from ipr.fitting import calculate_coefficients, fit_params, fit_params_cached, forchheimer_log_loss
+from ipr.synthetic import synthetic_field
+from ipr.wells import WellIndex
+
+def gas_loss(index, params):
+    return forchheimer_log_loss(params[:, 0], params[:, 1], index.Q, index.Pwf, index.Pws, index.codes(),
+                                len(index))[0]
+
+@pytest.fixture(scope='module')
+def gas_index():
+    data, _ = synthetic_field('Gas', 40, tests=(3, 6), seed=2)
+    return WellIndex.from_data(data, 'Gas')
+
+# The batch fit minimizes the same log loss as the per-well solvers: no well may end worse
+@pytest.mark.parametrize('solver', ['minimize', 'least_squares'])
+def test_batch_loss_not_worse_than_per_well_solvers(gas_index, solver):
+    batch, _ = fit_params('Gas', gas_index, solver='batch')
+    per_well, _ = fit_params('Gas', gas_index, solver=solver)
+    batch_loss, per_well_loss = gas_loss(gas_index, batch), gas_loss(gas_index, per_well)
+    assert np.all(batch_loss <= per_well_loss * (1 + 1e-6) + 1e-12)
+
+def test_least_squares_stays_on_the_physical_branch(gas_index):
+    params, _ = fit_params('Gas', gas_index, solver='least_squares')
+    _, u, _ = forchheimer_log_loss(params[:, 0], params[:, 1], gas_index.Q, gas_index.Pwf, gas_index.Pws,
+                                   gas_index.codes(), len(gas_index))
+    assert np.all(u > 0)
+
+@pytest.mark.parametrize('reservoir_type, column', [('Gas', 'AOF (km3/d)'), ('Oil', 'Qmax (m3/d)')])
+def test_batch_recovers_noise_free_coefficients(reservoir_type, column):
+    data, truth = synthetic_field(reservoir_type, 50, noise=0, seed=1)
+    coefficients_df = calculate_coefficients(data, reservoir_type)
+    assert list(coefficients_df['Well']) == list(truth['Well'])
+    np.testing.assert_allclose(coefficients_df[column], truth[column], rtol=1e-6)
+
+def test_oil_batch_matches_minimize():
+    data, _ = synthetic_field('Oil', 30, seed=4)
+    batch = calculate_coefficients(data, 'Oil')
+    per_well = calculate_coefficients(data, 'Oil', solver='minimize')
+    np.testing.assert_allclose(batch['Qmax (m3/d)'], per_well['Qmax (m3/d)'], rtol=1e-4)
+
+def test_cache_key_includes_warm_start(gas_index):
+    cache = FitCache()
+    fit_params_cached(cache, 'Gas', gas_index, solver='minimize')
+    _, diagnostics = fit_params_cached(cache, 'Gas', gas_index, solver='minimize')
+    assert (diagnostics['Solver message'] == 'cached').all()
+
+    _, diagnostics = fit_params_cached(cache, 'Gas', gas_index, solver='minimize', warm_start='linear')
+    assert not (diagnostics['Solver message'] == 'cached').any()
+
+def test_bootstrap_independent_of_memory_budget():
+    data, _ = synthetic_field('Gas', 30, seed=5)
+    default = calculate_coefficients(data, 'Gas', bootstrap=40)
+    small = calculate_coefficients(data, 'Gas', bootstrap=40, bootstrap_memory=50_000)
+    assert default.equals(small)
+
+# A shut-in point at BHP = Pres is valid input (see ipr.validation) and is left out of the Vogel fit
+@pytest.mark.parametrize('solver', ['minimize', 'least_squares'])
+@pytest.mark.parametrize('warm_start', [None, 'linear'])
+def test_oil_per_well_solvers_skip_shut_in_points(solver, warm_start):
+    data = pd.DataFrame({'Well': ['A', 'A', 'A', 'B'], 'Pres (bar)': 200.0, 'BHP (bar)': [200, 150, 100, 200],
+                         'Rate (m3/d)': [0, 50, 90, 0]})
+    coefficients_df = calculate_coefficients(data, 'Oil', solver=solver, warm_start=warm_start, instrument=True)
+    expected = calculate_coefficients(data, 'Oil')
+
+    assert coefficients_df['Converged'].tolist() == [True, False]
+    np.testing.assert_allclose(coefficients_df['Qmax (m3/d)'], expected['Qmax (m3/d)'], rtol=1e-4)
+    assert coefficients_df['Shut-in points'].tolist() == [1, 1]
+
+# Pools return the chunks in well order: every backend gives the serial result, row for row
+@pytest.mark.parametrize('backend', ['threads', 'processes'])
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+def test_parallel_backends_match_serial(reservoir_type, backend):
+    data, _ = synthetic_field(reservoir_type, 45, seed=7)
+    serial = calculate_coefficients(data, reservoir_type, solver='minimize', chunk_size=4)
+    parallel = calculate_coefficients(data, reservoir_type, solver='minimize', backend=backend, max_workers=2,
+                                      chunk_size=4)
+    assert list(parallel['Well']) == list(serial['Well'])
+    pd.testing.assert_frame_equal(parallel, serial)
+
+def test_unknown_backend(gas_index):
+    with pytest.raises(ValueError, match="Unknown backend"):
+        fit_params('Gas', gas_index, solver='minimize', backend='cluster', max_workers=2)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ipr.fitting import calculate_coefficients
+from ipr.history import calculate_history
+from ipr.synthetic import synthetic_field
+
+ORIGIN = pd.Timestamp('2020-01-01')
+
+# Synthetic field with dated tests (shuffled rows) and a reservoir pressure declining with time
+def dated_field(reservoir_type, seed=14):
+    data, _ = synthetic_field(reservoir_type, 30, tests=(15, 30), seed=seed)
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 1000, len(data))
+    data['Date'] = ORIGIN + pd.to_timedelta(days, unit='D')
+    data['Pres (bar)'] = data['Pres (bar)'] - 0.001 * days
+    return data.sample(frac=1, random_state=seed)
+
+# Direct fit of the tests of one window, with the reservoir pressure of its first test
+def direct_fit(data, reservoir_type, window):
+    rows = data[(data['Well'] == window['Well']) & (data['Date'] >= window['Window start'])
+                & (data['Date'] < window['Window end'] + pd.Timedelta(days=1))].sort_values('Date', kind='stable')
+    rows = rows.assign(**{'Pres (bar)': rows['Pres (bar)'].iloc[0]})
+    return rows, calculate_coefficients(rows, reservoir_type).iloc[0]
+
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+@pytest.mark.parametrize('windows', [dict(window=180, step=30), dict(window=90), dict(calendar='quarter')])
+def test_windows_match_direct_fits(reservoir_type, windows):
+    data = dated_field(reservoir_type)
+    history = calculate_history(data, reservoir_type, **windows)
+    assert len(history)
+
+    for i in np.random.default_rng(0).choice(len(history), 10, replace=False):
+        window = history.iloc[i]
+        rows, expected = direct_fit(data, reservoir_type, window)
+        assert len(rows) == window['Tests']
+        columns = [column for column in expected.index if column != 'Well']
+        np.testing.assert_allclose(window[columns].astype(float), expected[columns].astype(float), rtol=1e-4)
+
+def test_calendar_windows():
+    data = dated_field('Oil')
+    history = calculate_history(data, 'Oil', calendar='month')
+    assert (history['Window start'].dt.day == 1).all()
+    assert (history['Window end'] == history['Window start'] + pd.offsets.MonthEnd(0)).all()
+    assert history['Tests'].sum() == len(data)
+
+def test_min_tests():
+    data = dated_field('Gas')
+    history = calculate_history(data, 'Gas', window=30, min_tests=3)
+    assert (history['Tests'] >= 3).all()
+
+def test_requires_date_column():
+    data, _ = synthetic_field('Gas', 3)
+    with pytest.raises(ValueError, match="Date"):
+        calculate_history(data, 'Gas')
+
+def test_rows_without_well_name_are_ignored():
+    data = dated_field('Gas')
+    unnamed = data.iloc[:5].assign(Well=None, Date=ORIGIN - pd.Timedelta(days=100))
+    expected = calculate_history(data, 'Gas', window=60, step=20)
+    pd.testing.assert_frame_equal(calculate_history(pd.concat([unnamed, data]), 'Gas', window=60, step=20), expected)
+
+# A well with small rates sorted after a well with large ones keeps the precision of its own sums
+def test_window_sums_restart_at_every_well():
+    rng = np.random.default_rng(0)
+    Q_large = rng.uniform(500, 2000, 20_000)
+    Q_small = np.array([0.5, 1, 1.5])
+    data = pd.DataFrame({
+        'Well': ['A'] * len(Q_large) + ['B'] * len(Q_small),
+        'Date': ORIGIN,
+        'Pres (bar)': [2000.0] * len(Q_large) + [100.0] * len(Q_small),
+        'BHP (bar)': np.r_[np.sqrt(np.maximum(2000 ** 2 - 0.5 * Q_large ** 2 - 20 * Q_large, 1e4)),
+                           np.sqrt(100 ** 2 - 0.5 * Q_small ** 2 - 20 * Q_small)],
+        'Rate (km3/d)': np.r_[Q_large, Q_small],
+    })
+    history = calculate_history(data, 'Gas', refine=False).set_index('Well')
+    expected = calculate_coefficients(data[data['Well'] == 'B'], 'Gas', refine=False).iloc[0]
+    assert history.loc['B', 'AOF (km3/d)'] == pytest.approx(expected['AOF (km3/d)'], rel=1e-6)
+    assert history.loc['B', 'a (bar2/(m3/d)2)'] == pytest.approx(5e-7, rel=1e-6)
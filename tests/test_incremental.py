@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ipr.fitting import calculate_coefficients
+from ipr.incremental import WellStatistics
+from ipr.synthetic import synthetic_field
+
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+def test_matches_closed_form_fit(reservoir_type):
+    data, _ = synthetic_field(reservoir_type, 60, seed=6)
+    statistics = WellStatistics(reservoir_type)
+    # Shuffled chunks: the sums don't depend on the order of the tests
+    shuffled = data.sample(frac=1, random_state=0)
+    for chunk in np.array_split(np.arange(len(shuffled)), 7):
+        statistics.update(shuffled.iloc[chunk])
+
+    expected = calculate_coefficients(data, reservoir_type, refine=False)
+    pd.testing.assert_frame_equal(statistics.coefficients(), expected, check_dtype=False, rtol=1e-8)
+
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+def test_retract_round_trip(reservoir_type):
+    data, _ = synthetic_field(reservoir_type, 20, seed=7)
+    extra, _ = synthetic_field(reservoir_type, 20, seed=8)
+    statistics = WellStatistics(reservoir_type)
+    statistics.update(data)
+    before = statistics.coefficients()
+
+    statistics.update(extra)
+    assert not statistics.coefficients().equals(before)
+    statistics.retract(extra)
+    pd.testing.assert_frame_equal(statistics.coefficients(), before, rtol=1e-6)
+
+def test_retract_all_tests_of_a_well():
+    data, _ = synthetic_field('Gas', 5, seed=9)
+    statistics = WellStatistics('Gas')
+    statistics.update(data)
+    statistics.retract(data[data['Well'] == 'W0'])
+    assert np.isnan(statistics.fit('W0')['AOF (km3/d)'])
+
+def test_retract_unknown_well():
+    data, _ = synthetic_field('Gas', 5, seed=9)
+    statistics = WellStatistics('Gas')
+    with pytest.raises(KeyError):
+        statistics.retract(data)
+
+def test_append_refits_one_well():
+    data, _ = synthetic_field('Oil', 10, seed=10)
+    statistics = WellStatistics('Oil')
+    statistics.update(data.iloc[:-1])
+    last = data.iloc[-1]
+    fit = statistics.append(last['Well'], last['Pres (bar)'], last['BHP (bar)'], last['Rate (m3/d)'])
+
+    expected = calculate_coefficients(data, 'Oil').set_index('Well').loc[last['Well']]
+    assert fit['Qmax (m3/d)'] == pytest.approx(expected['Qmax (m3/d)'])
+
+# Integer well names, as read_csv gives for numeric well IDs, keep their type
+@pytest.mark.parametrize('integer_wells', [False, True])
+def test_save_load(tmp_path, integer_wells):
+    data, _ = synthetic_field('Gas', 10, seed=11)
+    if integer_wells:
+        data['Well'] = data['Well'].str[1:].astype(int)
+    statistics = WellStatistics('Gas')
+    statistics.update(data)
+    statistics.save(tmp_path / 'statistics.npz')
+    loaded = WellStatistics.load(tmp_path / 'statistics.npz')
+    pd.testing.assert_frame_equal(loaded.coefficients(), statistics.coefficients())
+
+    well = data['Well'].iloc[0]
+    assert loaded.fit(well) == statistics.fit(well)
+
+def test_rows_without_well_name_are_ignored():
+    data, _ = synthetic_field('Gas', 5, seed=12)
+    unnamed = data.iloc[:3].assign(Well=None, **{'Pres (bar)': 999.0})
+    statistics = WellStatistics('Gas')
+    statistics.update(pd.concat([unnamed, data, unnamed]))
+    expected = calculate_coefficients(data, 'Gas', refine=False)
+    pd.testing.assert_frame_equal(statistics.coefficients(), expected, check_dtype=False, rtol=1e-8)
+
+    statistics.retract(unnamed)
+    pd.testing.assert_frame_equal(statistics.coefficients(), expected, check_dtype=False, rtol=1e-8)
@@ -0,0 +1,16 @@
+import io
+import zipfile
+
+import pandas as pd
+
+from ipr.fitting import calculate_coefficients
+from ipr.report import report_bytes
+from ipr.wells import WellIndex
+
+def test_plot_names_are_unique():
+    data = pd.DataFrame({'Well': ['A/1'] * 3 + ['A_1'] * 3, 'Pres (bar)': 200.0,
+                         'BHP (bar)': [180, 150, 110] * 2, 'Rate (km3/d)': [100, 200, 300] * 2})
+    coefficients_df = calculate_coefficients(data, 'Gas')
+    index = WellIndex.from_data(data, 'Gas')
+    with zipfile.ZipFile(io.BytesIO(report_bytes(coefficients_df, 'Gas', index, backend='serial'))) as report:
+        assert report.namelist() == ['coefficients.csv', 'plots/0_A_1.png', 'plots/1_A_1.png']
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from ipr.fitting import calculate_coefficients
+from ipr.models import curve_IPR, curve_IPR_Vogel
+from ipr.sensitivity import SensitivityCube, fetkovich_AOF, pressure_grid
+from ipr.synthetic import synthetic_field
+
+COLUMNS = {'Gas': 'AOF (km3/d)', 'Oil': 'Qmax (m3/d)'}
+
+@pytest.fixture(scope='module', params=['Gas', 'Oil'])
+def field(request):
+    data, _ = synthetic_field(request.param, 12, seed=3)
+    return request.param, calculate_coefficients(data, request.param)
+
+def test_cube_matches_fetkovich_per_well(field):
+    reservoir_type, coefficients_df = field
+    Pws_new, n = [120.0, 80.0, 40.0], [0.5, 0.75, 1.0]
+    cube = SensitivityCube.from_coefficients(coefficients_df, reservoir_type, Pws_new, n)
+    assert cube.shape == (12, 3, 3)
+    assert cube.AOF.dtype == np.float32
+
+    AOF, Pws = coefficients_df[COLUMNS[reservoir_type]], coefficients_df['Pres (bar)']
+    for j, pressure in enumerate(Pws_new):
+        for k, exponent in enumerate(n):
+            expected = fetkovich_AOF(reservoir_type, AOF, Pws, pressure, exponent)
+            np.testing.assert_allclose(cube.AOF[:, j, k], expected, rtol=1e-6)
+            np.testing.assert_allclose(cube.field_AOF()[j, k], expected.sum(), rtol=1e-6)
+
+def test_per_well_pressure_grid(field):
+    reservoir_type, coefficients_df = field
+    cube = SensitivityCube.from_coefficients(coefficients_df, reservoir_type,
+                                             pressure_grid(coefficients_df['Pres (bar)'], [1.0, 0.5]), [0.5])
+    # At the current pressure the AOF doesn't change
+    np.testing.assert_allclose(cube.AOF[:, 0, 0], coefficients_df[COLUMNS[reservoir_type]], rtol=1e-6)
+
+def test_curves_follow_the_models(field):
+    reservoir_type, coefficients_df = field
+    cube = SensitivityCube.from_coefficients(coefficients_df, reservoir_type, [150.0, 100.0], [0.5, 1.0])
+    Q, Pwf = cube.curves(points=20, wells=[1, 4])
+    assert Q.shape == Pwf.shape == (2, 2, 2, 20)
+
+    for position, i in enumerate([1, 4]):
+        for j, pressure in enumerate([150.0, 100.0]):
+            AOF = cube.AOF[i, j, 0]
+            if reservoir_type == 'Gas':
+                a, b = cube.params[i]
+                np.testing.assert_allclose(Q[position, j, 0], np.linspace(0, AOF, 20), rtol=1e-5)
+                # The last point is the AOF itself, where rounding can take the root below 0
+                expected = curve_IPR(Q[position, j, 0, :-1].astype(float), [a, b, pressure])
+                np.testing.assert_allclose(Pwf[position, j, 0, :-1], expected, rtol=1e-3)
+            else:
+                np.testing.assert_allclose(Pwf[position, j, 0], np.linspace(0, pressure, 20), rtol=1e-5)
+                expected = curve_IPR_Vogel(Pwf[position, j, 0].astype(float), pressure, AOF)
+                np.testing.assert_allclose(Q[position, j, 0], expected, rtol=1e-5, atol=1e-3)
+
+def test_to_frame_and_save_load(field, tmp_path):
+    reservoir_type, coefficients_df = field
+    cube = SensitivityCube.from_coefficients(coefficients_df, reservoir_type, [150.0, 100.0, 50.0], [0.5, 1.0])
+    frame = cube.to_frame()
+    assert len(frame) == 12 * 3 * 2
+    row = frame.iloc[2 * 3 + 2 * 1 + 1]
+    assert row['Well'] == cube.wells[1] and row['Pres (bar)'] == 100.0 and row['n'] == 1.0
+    assert row[COLUMNS[reservoir_type]] == cube.AOF[1, 1, 1]
+
+    cube.save(tmp_path / 'cube.npz')
+    loaded = SensitivityCube.load(tmp_path / 'cube.npz')
+    assert loaded.reservoir_type == reservoir_type
+    assert list(loaded.wells) == list(map(str, cube.wells))
+    np.testing.assert_array_equal(loaded.AOF, cube.AOF)
+    np.testing.assert_array_equal(loaded.Pws_new, cube.Pws_new)
+    np.testing.assert_array_equal(loaded.params, cube.params)
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from ipr.fitting import DIAGNOSTIC_COLUMNS, calculate_coefficients, solver_summary
+from ipr.streaming import stream_coefficients
+from ipr.synthetic import synthetic_field
+from ipr.tables import write_table
+
+@pytest.fixture
+def gas_file(tmp_path):
+    data, _ = synthetic_field('Gas', 40, seed=16)
+    path = tmp_path / 'tests.csv'
+    write_table(data, path)
+    return data, path
+
+def test_sorted_matches_calculate_coefficients(gas_file):
+    data, path = gas_file
+    streamed = pd.concat(stream_coefficients(path, 'Gas', chunksize=17), ignore_index=True)
+    expected = calculate_coefficients(data, 'Gas')
+    # Streaming reads the test columns as float32
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False, rtol=1e-4)
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet', 'feather'])
+def test_statistics_mode_any_order(tmp_path, file_format):
+    data, _ = synthetic_field('Oil', 40, seed=17)
+    path = tmp_path / f'tests.{file_format}'
+    write_table(data.sample(frac=1, random_state=0), path)
+    streamed, = stream_coefficients(path, 'Oil', chunksize=23, mode='statistics')
+    expected = calculate_coefficients(data, 'Oil', refine=False)
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False, check_categorical=False, rtol=1e-4)
+
+def test_sorted_rejects_non_contiguous_wells(tmp_path):
+    data, _ = synthetic_field('Gas', 40, seed=16)
+    path = tmp_path / 'shuffled.csv'
+    write_table(data.sample(frac=1, random_state=0), path)
+    with pytest.raises(ValueError, match="not contiguous"):
+        list(stream_coefficients(path, 'Gas', chunksize=17))
+
+@pytest.mark.parametrize('mode', ['sorted', 'statistics'])
+def test_validate_checks_columns(gas_file, mode):
+    _, path = gas_file
+    with pytest.raises(ValueError, match="Missing columns for a oil reservoir"):
+        list(stream_coefficients(path, 'Oil', mode=mode, validate=True))
+
+def test_statistics_mode_diagnostics(gas_file):
+    _, path = gas_file
+    streamed, = stream_coefficients(path, 'Gas', mode='statistics', instrument=True)
+    assert list(streamed.columns[-len(DIAGNOSTIC_COLUMNS):]) == DIAGNOSTIC_COLUMNS
+    assert streamed['Converged'].all()
+    assert solver_summary(streamed)['Wells'] == 40
+
+@pytest.mark.parametrize('settings', [dict(solver='minimize'), dict(bootstrap=100)])
+def test_statistics_mode_rejects_unsupported_settings(gas_file, settings):
+    _, path = gas_file
+    with pytest.raises(ValueError, match="statistics ingestion"):
+        list(stream_coefficients(path, 'Gas', mode='statistics', **settings))
+
+def test_validate_can_drop_every_row(tmp_path):
+    path = tmp_path / 'invalid.csv'
+    write_table(pd.DataFrame({'Well': ['A', 'A'], 'Pres (bar)': [100.0, 100.0], 'BHP (bar)': [150.0, 120.0],
+                              'Rate (km3/d)': [10.0, 20.0]}), path)
+    assert list(stream_coefficients(path, 'Gas', validate=True)) == []
+    streamed, = stream_coefficients(path, 'Gas', mode='statistics', validate=True)
+    assert streamed.empty
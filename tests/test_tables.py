@@ -0,0 +1,49 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ipr.tables import TEST_COLUMNS, read_table, read_table_chunks, table_bytes, table_format, write_table
+
+def typed_table():
+    return pd.DataFrame({
+        'Well': pd.Categorical(['A', 'A', 'B', 'C']),
+        'Pres (bar)': np.array([200, 200, 150, 180], dtype=np.float32),
+        'BHP (bar)': np.array([180, 150, 120, 170], dtype=np.float32),
+        'Rate (km3/d)': [100.0, 200.0, 80.0, 50.0],
+        'Comment': ['a', 'b', 'c', 'd'],
+    })
+
+@pytest.mark.parametrize('extension', ['.parquet', '.feather'])
+def test_round_trip_keeps_dtypes(extension, tmp_path):
+    table = typed_table()
+    write_table(table, tmp_path / f'tests{extension}')
+    pd.testing.assert_frame_equal(read_table(tmp_path / f'tests{extension}'), table)
+
+@pytest.mark.parametrize('file_format', ['parquet', 'feather'])
+def test_file_objects_and_columns(file_format):
+    table = typed_table()
+    content = table_bytes(table, file_format)
+    loaded = read_table(io.BytesIO(content), TEST_COLUMNS, file_format)
+    # Only the test columns the file has, in the requested order
+    assert list(loaded.columns) == ['Well', 'Pres (bar)', 'BHP (bar)', 'Rate (km3/d)']
+    pd.testing.assert_frame_equal(loaded, table[loaded.columns])
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet', '.feather'])
+def test_chunks_concatenate_to_the_table(extension, tmp_path):
+    table = typed_table()
+    write_table(table, tmp_path / f'tests{extension}')
+    chunks = list(read_table_chunks(tmp_path / f'tests{extension}', TEST_COLUMNS, 3,
+                                    dtypes={'Pres (bar)': np.float32, 'Rate (km3/d)': np.float32}))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    loaded = pd.concat(chunks, ignore_index=True)
+    assert loaded['Rate (km3/d)'].dtype == np.float32
+    np.testing.assert_array_equal(loaded['Pres (bar)'], table['Pres (bar)'])
+
+def test_formats():
+    assert table_format('tests.PQ') == 'parquet' and table_format('tests.arrow') == 'feather'
+    assert table_format('tests.txt') == 'csv'
+    assert table_bytes(typed_table()[['Well']], 'csv') == b"Well\nA\nA\nB\nC\n"
+    with pytest.raises(ValueError, match="Unknown format"):
+        write_table(typed_table(), io.BytesIO(), 'xlsx')
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from ipr.synthetic import synthetic_field
+from ipr.validation import REPORT_COLUMNS, validate_tests, validation_summary
+
+def test_report_contents():
+    data = pd.DataFrame({
+        'Well': ['A', 'A', 'A', 'B', 'B', 'C', 'C', 'D', None],
+        'Pres (bar)': [200, 200, 200, 150, 150, 180, 180, 100, 100],
+        'BHP (bar)': [180, 150, 210, 120, -5, 170, 160, 90, 90],
+        'Rate (km3/d)': [100, 200, 50, 80, 90, 'n/a', -1, 10, 10],
+    })
+    valid_data, report = validate_tests(data, 'Gas')
+
+    assert list(report.columns) == REPORT_COLUMNS
+    report = report.set_index('Well')
+    assert list(report.index) == ['A', 'B', 'C', 'D']
+    assert report.loc['A', 'Status'] == 'warning'
+    assert report.loc['A', 'Issues'] == "BHP >= Pres (1)"
+    assert (report.loc['A', 'Tests'], report.loc['A', 'Valid tests']) == (3, 2)
+    assert report.loc['B', 'Issues'] == "BHP <= 0 (1); single flowing test, a and b not unique"
+    assert report.loc['C', 'Status'] == 'skipped'
+    assert report.loc['C', 'Issues'] == "missing value (1); negative rate (1); no valid flowing test"
+    assert report.loc['D', 'Issues'] == "single flowing test, a and b not unique"
+
+    # Valid tests of the wells that aren't skipped, as floats
+    assert list(valid_data['Well']) == ['A', 'A', 'B', 'D']
+    assert (valid_data[['Pres (bar)', 'BHP (bar)', 'Rate (km3/d)']].dtypes == float).all()
+    assert validation_summary(report.reset_index(), data, valid_data) == \
+        "4 wells: 1 skipped, 3 with warnings, 5 of 9 test rows not fitted"
+
+def test_mixed_reservoir_pressure():
+    data = pd.DataFrame({'Well': ['A', 'A'], 'Pres (bar)': [300, 290], 'BHP (bar)': [200, 250],
+                         'Rate (m3/d)': [100, 50]})
+    _, report = validate_tests(data, 'Oil')
+    assert list(report['Issues']) == ["mixed Pres, first one used"]
+
+def test_shut_in_anchor_point_is_valid():
+    data = pd.DataFrame({'Well': ['A', 'A', 'A'], 'Pres (bar)': [300, 300, 300], 'BHP (bar)': [300, 200, 150],
+                         'Rate (km3/d)': [0, 100, 150]})
+    valid_data, report = validate_tests(data, 'Gas')
+    assert report.empty
+    assert len(valid_data) == 3
+
+@pytest.mark.parametrize('reservoir_type', ['Gas', 'Oil'])
+def test_clean_upload_has_empty_report(reservoir_type):
+    data, _ = synthetic_field(reservoir_type, 20, noise=0, seed=15)
+    valid_data, report = validate_tests(data, reservoir_type)
+    assert report.empty
+    assert list(report.columns) == REPORT_COLUMNS
+    pd.testing.assert_frame_equal(valid_data, data)
+    assert validation_summary(report, data, valid_data) == \
+        f"20 wells: 0 skipped, 0 with warnings, 0 of {len(data)} test rows not fitted"
+
+def test_missing_columns():
+    data, _ = synthetic_field('Oil', 3)
+    with pytest.raises(ValueError, match=r"Missing columns for a gas reservoir: Rate \(km3/d\)"):
+        validate_tests(data, 'Gas')
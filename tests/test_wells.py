@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from ipr.fitting import calculate_coefficients
+from ipr.wells import WellIndex
+
+def test_index_groups_rows_by_well():
+    data = pd.DataFrame({'Well': ['B', 'A', 'B', 'A', 'C'], 'Pres (bar)': [150, 200, 150, 210, 100],
+                         'BHP (bar)': [100, 180, 120, 170, 90], 'Rate (m3/d)': [10, 20, 30, 40, 50]})
+    index = WellIndex.from_data(data, 'Oil')
+    assert list(index.wells) == ['A', 'B', 'C']
+    assert list(index.offsets) == [0, 2, 4, 5]
+    # Rows keep their order within a well, Pws is the first test of each well
+    assert list(index.Q) == [20, 40, 10, 30, 50]
+    assert list(index.Pws) == [200, 150, 100]
+    assert index.position('B') == 1
+
+    subset = index.subset(np.array([0, 2]))
+    assert list(subset.wells) == ['A', 'C']
+    assert list(subset.Pwf) == [180, 170, 90]
+
+def test_rows_without_well_name_are_left_out():
+    data = pd.DataFrame({'Well': [None, 'A', 'A', np.nan], 'Pres (bar)': [999, 200, 200, 999],
+                         'BHP (bar)': [1, 180, 150, 1], 'Rate (m3/d)': [1, 20, 40, 1]})
+    index = WellIndex.from_data(data, 'Oil')
+    assert list(index.wells) == ['A']
+    assert list(index.offsets) == [0, 2]
+    assert list(index.Pws) == [200]
+    assert list(index.Q) == [20, 40]
+
+    expected = calculate_coefficients(data.dropna(subset=['Well']), 'Oil')
+    pd.testing.assert_frame_equal(calculate_coefficients(data, 'Oil'), expected)
+
+def test_single_well_index_fits_like_a_table():
+    data = pd.DataFrame({'Well': 'A', 'Pres (bar)': 200.0, 'BHP (bar)': [180, 150, 110],
+                         'Rate (km3/d)': [100, 200, 280]})
+    index = WellIndex.single_well('A', 200.0, data['BHP (bar)'], data['Rate (km3/d)'])
+    assert len(index) == 1 and index.wells[0] == 'A'
+    pd.testing.assert_frame_equal(calculate_coefficients(index, 'Gas', solver='minimize'),
+                                  calculate_coefficients(data, 'Gas', solver='minimize'), check_dtype=False)